@@ -3,32 +3,99 @@ API Integration for Clinic Risk Assessment ML Model
 Provides REST API endpoints for risk assessment predictions
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import pandas as pd
+import hashlib
+import json
 import logging
 import os
+import re
+import time
 from datetime import datetime
-from clinic_risk_model import ClinicRiskModel
+from uuid import uuid4
+from clinic_risk_model import ClinicRiskModel, PREDICTION_COLUMNS
+from batch_scorer import BatchScorer
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (handles numpy types natively)"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 
+# Fields every clinic payload must provide
+REQUIRED_FIELDS = ['clinic_name', 'email']
+
+# Precompiled validation patterns
+EMAIL_RE = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+PHONE_RE = re.compile(r'[\d+\- ]*\d[\d+\- ]*')
+
 # Load the trained model
 model = ClinicRiskModel()
 model_loaded = False
 
+def build_model_info():
+    """Build the /model-info payload for the currently loaded model"""
+    return {
+        'model_version': model.model_version,
+        'feature_columns': model.feature_columns,
+        'model_type': 'ensemble',
+        'algorithms_tested': ['RandomForest', 'HistGradientBoosting', 'LogisticRegression'],
+        'risk_thresholds': {
+            'low_risk_max': 0.3,
+            'medium_risk_max': 0.7,
+            'high_risk_min': 0.7
+        },
+        'account_statuses': ['ACTIVE_LIMITED', 'VERIFICATION_REQUIRED', 'RESTRICTED'],
+        'supported_features': [
+            'business_legitimacy',
+            'behavioral_patterns',
+            'data_completeness',
+            'business_maturity',
+            'scale_analysis'
+        ]
+    }
+
+# Serialized /model-info response, rebuilt whenever the model is (re)loaded
+model_info_payload = None
+
 def load_model():
     """Load the trained model on startup"""
-    global model_loaded
+    global model_loaded, model_info_payload
     try:
         model_path = os.environ.get('MODEL_PATH', 'clinic_risk_model.joblib')
         if model.load_model(model_path):
+            model_info_payload = app.json.dumps({
+                'success': True,
+                'data': build_model_info()
+            })
             model_loaded = True
             logger.info(f"Model loaded successfully from {model_path}")
         else:
@@ -36,10 +103,86 @@ def load_model():
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         model_loaded = False
+    return model_loaded
 
 # Load model on startup
 load_model()
 
+# Dynamic request batching for /assess-risk (opt-in; most useful with threaded workers)
+batch_scorer = None
+if os.environ.get('RISK_BATCHING', 'False').lower() == 'true':
+    batch_scorer = BatchScorer(
+        model,
+        max_batch_size=int(os.environ.get('RISK_BATCH_MAX_SIZE', 32)),
+        max_latency_ms=float(os.environ.get('RISK_BATCH_MAX_LATENCY_MS', 10))
+    )
+
+# Response cache (enabled when REDIS_URL is set)
+RISK_CACHE_TTL = int(os.environ.get('RISK_CACHE_TTL', 3600))
+
+def init_cache():
+    """Connect to Redis for response caching, if configured"""
+    redis_url = os.environ.get('REDIS_URL')
+    if not redis_url:
+        return None
+    if redis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed; caching disabled")
+        return None
+    try:
+        client = redis.Redis.from_url(redis_url)
+        client.ping()
+        logger.info("Response cache connected")
+        return client
+    except Exception as e:
+        logger.warning(f"Could not connect to Redis, caching disabled: {e}")
+        return None
+
+cache = init_cache()
+
+def cache_get(key):
+    """Return a cached JSON value, or None on miss or cache error"""
+    if cache is None:
+        return None
+    try:
+        value = cache.get(key)
+        return json.loads(value) if value is not None else None
+    except Exception as e:
+        logger.warning(f"Cache read failed: {e}")
+        return None
+
+def cache_set(key, value, ttl=None):
+    """Store a JSON value in the cache, optionally with a TTL in seconds"""
+    if cache is None:
+        return
+    try:
+        payload = json.dumps(value, default=str)
+        if ttl:
+            cache.setex(key, ttl, payload)
+        else:
+            cache.set(key, payload)
+    except Exception as e:
+        logger.warning(f"Cache write failed: {e}")
+
+def cache_delete_pattern(*patterns):
+    """Delete all cached keys matching the given patterns"""
+    if cache is None:
+        return
+    try:
+        for pattern in patterns:
+            for key in cache.scan_iter(match=pattern):
+                cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed: {e}")
+
+def risk_cache_key(clinic_data):
+    """Build a cache key from the loaded model and the request fields it reads"""
+    # Fields the model ignores (request IDs, notes, ...) don't split the cache, and the
+    # version prefix plus training date keep entries from another model from being served
+    # even if a worker reloads without clearing the cache
+    fields = {field: clinic_data[field] for field in PREDICTION_COLUMNS if field in clinic_data}
+    canonical = json.dumps([model.training_date, fields], sort_keys=True, separators=(',', ':'), default=str)
+    return f"risk:{model.model_version}:" + hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -59,9 +202,11 @@ def assess_risk():
             'message': 'Risk assessment service is currently unavailable'
         }), 503
 
+    start_ns = time.perf_counter_ns()
+
     try:
         # Get clinic data from request
-        clinic_data = request.get_json()
+        clinic_data = request.get_json(silent=True)
         
         if not clinic_data:
             return jsonify({
@@ -70,8 +215,7 @@ def assess_risk():
             }), 400
 
         # Validate required fields
-        required_fields = ['clinic_name', 'email']
-        missing_fields = [field for field in required_fields if field not in clinic_data]
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in clinic_data]
         
         if missing_fields:
             return jsonify({
@@ -82,20 +226,32 @@ def assess_risk():
         # Make prediction
         logger.info(f"🔮 Making risk assessment for clinic: {clinic_data.get('clinic_name', 'Unknown')}")
         
-        result = model.predict_risk(clinic_data)
+        cache_key = risk_cache_key(clinic_data)
+        result = cache_get(cache_key)
         
         if result is None:
-            return jsonify({
-                'error': 'Prediction failed',
-                'message': 'Unable to complete risk assessment'
-            }), 500
+            if batch_scorer is not None:
+                result = batch_scorer.predict(clinic_data)
+            else:
+                result = model.predict_risk(clinic_data)
+            
+            if result is None:
+                return jsonify({
+                    'error': 'Prediction failed',
+                    'message': 'Unable to complete risk assessment'
+                }), 500
+            
+            cache_set(cache_key, result, ttl=RISK_CACHE_TTL)
+        else:
+            # The cached prediction may be up to RISK_CACHE_TTL old; report when this one was served
+            result['prediction_timestamp'] = datetime.now().isoformat()
 
         # Add metadata
         result['api_version'] = '1.0'
-        result['processing_time_ms'] = 0  # TODO: Add timing
-        result['request_id'] = f"req_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}"
+        result['processing_time_ms'] = round((time.perf_counter_ns() - start_ns) / 1e6, 3)
+        result['request_id'] = f"req_{uuid4().hex}"
         
-        logger.info(f"✅ Risk assessment completed: {result['risk_level']} ({result['risk_score']:.3f})")
+        logger.info(f"✅ Risk assessment completed: {result['risk_level']} ({result['risk_score']:.3f}) in {result['processing_time_ms']:.1f}ms")
         
         return jsonify({
             'success': True,
@@ -119,7 +275,7 @@ def batch_assess_risk():
         }), 503
 
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         clinics = data.get('clinics', [])
         
         if not clinics:
@@ -137,24 +293,43 @@ def batch_assess_risk():
         results = []
         errors = []
         
-        for i, clinic_data in enumerate(clinics):
-            try:
-                result = model.predict_risk(clinic_data)
-                if result:
-                    result['batch_index'] = i
-                    results.append(result)
-                else:
+        # Validate required fields for the whole batch in one pass
+        is_valid = pd.DataFrame(clinics).reindex(columns=REQUIRED_FIELDS).notna().all(axis=1).to_numpy()
+        valid_indices = [i for i, valid in enumerate(is_valid) if valid]
+        
+        for i, valid in enumerate(is_valid):
+            if not valid:
+                errors.append({
+                    'batch_index': i,
+                    'error': 'Missing required fields',
+                    'clinic_name': clinics[i].get('clinic_name', 'Unknown')
+                })
+        
+        if valid_indices:
+            predictions = model.predict_risk_batch([clinics[i] for i in valid_indices])
+            
+            # One bad clinic fails the whole batch, so fall back to scoring individually
+            if predictions is None:
+                logger.warning(f"⚠️ Batch prediction failed, scoring {len(valid_indices)} clinics individually")
+                predictions = []
+                for i in valid_indices:
+                    try:
+                        predictions.append(model.predict_risk(clinics[i]))
+                    except Exception as e:
+                        logger.error(f"❌ Error in prediction for batch index {i}: {e}")
+                        predictions.append(None)
+            
+            for i, result in zip(valid_indices, predictions):
+                if result is None:
+                    logger.error(f"❌ Prediction failed for batch index {i}")
                     errors.append({
                         'batch_index': i,
                         'error': 'Prediction failed',
-                        'clinic_name': clinic_data.get('clinic_name', 'Unknown')
+                        'clinic_name': clinics[i].get('clinic_name', 'Unknown')
                     })
-            except Exception as e:
-                errors.append({
-                    'batch_index': i,
-                    'error': str(e),
-                    'clinic_name': clinic_data.get('clinic_name', 'Unknown')
-                })
+                else:
+                    result['batch_index'] = i
+                    results.append(result)
 
         logger.info(f"📊 Batch assessment completed: {len(results)} successful, {len(errors)} failed")
         
@@ -186,44 +361,13 @@ def model_info():
             'error': 'Model not loaded'
         }), 503
 
-    try:
-        info = {
-            'model_version': model.model_version,
-            'feature_columns': model.feature_columns,
-            'model_type': 'ensemble',
-            'algorithms_tested': ['RandomForest', 'GradientBoosting', 'LogisticRegression'],
-            'risk_thresholds': {
-                'low_risk_max': 0.3,
-                'medium_risk_max': 0.7,
-                'high_risk_min': 0.7
-            },
-            'account_statuses': ['ACTIVE_LIMITED', 'VERIFICATION_REQUIRED', 'RESTRICTED'],
-            'supported_features': [
-                'business_legitimacy',
-                'behavioral_patterns',
-                'data_completeness',
-                'business_maturity',
-                'scale_analysis'
-            ]
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': info
-        })
-
-    except Exception as e:
-        logger.error(f"❌ Error getting model info: {e}")
-        return jsonify({
-            'error': 'Internal server error',
-            'message': str(e)
-        }), 500
+    return Response(model_info_payload, mimetype='application/json')
 
 @app.route('/validate-clinic-data', methods=['POST'])
 def validate_clinic_data():
     """Validate clinic data format and required fields"""
     try:
-        clinic_data = request.get_json()
+        clinic_data = request.get_json(silent=True)
         
         if not clinic_data:
             return jsonify({
@@ -235,19 +379,18 @@ def validate_clinic_data():
         warnings = []
 
         # Check required fields
-        required_fields = ['clinic_name', 'email']
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if not clinic_data.get(field):
                 validation_errors.append(f'Missing required field: {field}')
 
         # Validate email format
         email = clinic_data.get('email', '')
-        if '@' not in email:
+        if not EMAIL_RE.fullmatch(email):
             validation_errors.append('Invalid email format')
 
         # Validate phone format if provided
         phone = clinic_data.get('phone', '')
-        if phone and not phone.replace('+', '').replace('-', '').replace(' ', '').isdigit():
+        if phone and not PHONE_RE.fullmatch(phone):
             warnings.append('Phone format may be invalid')
 
         # Validate year established
@@ -277,6 +420,9 @@ def reload_model():
         old_version = model.model_version if model_loaded else None
         
         if load_model():
+            # Predictions from the old model are now stale
+            cache_delete_pattern('risk:*')
+            
             return jsonify({
                 'success': True,
                 'message': 'Model reloaded successfully',
@@ -319,6 +465,7 @@ def internal_error(error):
     }), 500
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see wsgi.py)
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     
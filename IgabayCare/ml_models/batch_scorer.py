@@ -0,0 +1,96 @@
+"""
+Dynamic request batching for the Clinic Risk Assessment API
+Collects concurrent /assess-risk requests and scores them in one model call
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class _PendingPrediction:
+    """A single clinic waiting to be scored by the batch worker"""
+    __slots__ = ('clinic_data', 'result', 'done')
+
+    def __init__(self, clinic_data):
+        self.clinic_data = clinic_data
+        self.result = None
+        self.done = threading.Event()
+
+class BatchScorer:
+    # model.predict_risk_batch must score each clinic independently of the rest of the
+    # batch: a result depending on whichever requests shared the window would also be
+    # cached under the clinic's own key
+    def __init__(self, model, max_batch_size=32, max_latency_ms=10, timeout_s=30):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.timeout_s = timeout_s
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def predict(self, clinic_data):
+        """Queue a clinic for scoring and wait for its result (None on failure)"""
+        self._ensure_worker()
+
+        pending = _PendingPrediction(clinic_data)
+        self._queue.put(pending)
+
+        if not pending.done.wait(self.timeout_s):
+            logger.error("Timed out waiting for batched prediction")
+            return None
+        return pending.result
+
+    def _ensure_worker(self):
+        """Start the worker thread, restarting it in forked processes"""
+        with self._lock:
+            # Threads don't survive fork, so gunicorn workers each need their own
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), daemon=True)
+                self._thread.start()
+
+    def _run(self, pending_queue):
+        """Collect up to max_batch_size requests or wait max_latency, then score"""
+        while True:
+            batch = [pending_queue.get()]
+            deadline = time.monotonic() + self.max_latency
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._score(batch)
+
+    def _score(self, batch):
+        """Score a batch and hand each result back to its waiting request"""
+        try:
+            results = self.model.predict_risk_batch([pending.clinic_data for pending in batch])
+        except Exception as e:
+            logger.error(f"❌ Error in batched prediction: {e}")
+            results = None
+
+        # One bad clinic fails the whole batch, so fall back to scoring individually
+        if results is None and len(batch) > 1:
+            results = []
+            for pending in batch:
+                try:
+                    results.append(self.model.predict_risk(pending.clinic_data))
+                except Exception as e:
+                    logger.error(f"❌ Error in prediction: {e}")
+                    results.append(None)
+
+        for i, pending in enumerate(batch):
+            pending.result = results[i] if results else None
+            pending.done.set()
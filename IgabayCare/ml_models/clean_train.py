@@ -9,6 +9,25 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import joblib
 import os
+from data_utils import concat_str
+
+try:
+    from skl2onnx import to_onnx
+except ImportError:
+    to_onnx = None
+
+# Columns consumed from behavior_metrics.csv
+BEHAVIOR_COLUMNS = [
+    'mouseMoveCount',
+    'keyPressCount',
+    'timeOnPageSeconds',
+    'mouseMoveRate',
+    'keyPressRate',
+    'interactionBalance',
+    'interactionScore',
+    'idleRatio',
+    'label'
+]
 
 def main():
     print("=== ML Training with Your Behavioral Data ===")
@@ -20,7 +39,11 @@ def main():
     
     # Load behavioral data
     print("Loading behavioral metrics...")
-    behavior_df = pd.read_csv('../data/behavior_metrics.csv')
+    behavior_df = pd.read_csv(
+        '../data/behavior_metrics.csv', engine='pyarrow', usecols=BEHAVIOR_COLUMNS
+    )
+    # Behavioral metrics stay float32 (the RF's native dtype) through the pipeline
+    behavior_df = behavior_df.astype({col: np.float32 for col in BEHAVIOR_COLUMNS if col != 'label'})
     print(f"Loaded {len(behavior_df)} records")
     
     # Create comprehensive training data
@@ -28,119 +51,111 @@ def main():
     np.random.seed(42)
     n_records = len(behavior_df)
     
+    # Build synthetic string columns with vectorized numpy string ops
+    idx = np.arange(n_records).astype(str)
+    idx4 = np.char.zfill(idx, 4)
+    website_mask = np.random.random(n_records) > 0.3
+    phone_suffix = np.random.randint(1000, 9999, n_records).astype(str)
+    license_mask = np.random.random(n_records) > 0.2
+    accreditation_mask = np.random.random(n_records) > 0.4
+    
+    # Pull each behavioral column out once; the dict below and the risk
+    # scoring both reuse these arrays
+    behavior = {col: behavior_df[col].to_numpy() for col in BEHAVIOR_COLUMNS}
+    
     # Create clinic data with behavioral metrics
     clinic_data = {
-        'clinic_id': [f'clinic_{i:04d}' for i in range(n_records)],
-        'clinic_name': [f'Medical Center {i}' for i in range(n_records)],
-        'website': [f'https://clinic{i}.com' if np.random.random() > 0.3 else '' for i in range(n_records)],
-        'phone': [f'+1-555-{i:04d}-{np.random.randint(1000, 9999)}' for i in range(n_records)],
-        'email': [f'clinic{i}@healthcare.com' for i in range(n_records)],
-        'license_number': [f'LIC-{i:06d}' if np.random.random() > 0.2 else '' for i in range(n_records)],
-        'accreditation': [f'ACC-{i}' if np.random.random() > 0.4 else '' for i in range(n_records)],
+        'clinic_id': concat_str('clinic_', idx4),
+        'clinic_name': concat_str('Medical Center ', idx),
+        'website': np.where(website_mask, concat_str('https://clinic', idx, '.com'), ''),
+        'phone': concat_str('+1-555-', idx4, '-', phone_suffix),
+        'email': concat_str('clinic', idx, '@healthcare.com'),
+        'license_number': np.where(license_mask, concat_str('LIC-', np.char.zfill(idx, 6)), ''),
+        'accreditation': np.where(accreditation_mask, concat_str('ACC-', idx), ''),
         'year_established': np.random.randint(1990, 2024, n_records),
         'number_of_doctors': np.random.randint(1, 15, n_records),
         'number_of_staff': np.random.randint(0, 30, n_records),
-        'address': [f'{i} Healthcare Ave' for i in range(n_records)],
-        'city': [f'Medical City {i % 50}' for i in range(n_records)],
-        'state': [f'Health State {i % 25}' for i in range(n_records)],
-        'zip_code': [f'{i:05d}' for i in range(n_records)],
-        'description': [f'Comprehensive medical facility {i} providing quality healthcare services.' for i in range(n_records)],
+        'address': concat_str(idx, ' Healthcare Ave'),
+        'city': pd.Categorical(concat_str('Medical City ', (np.arange(n_records) % 50).astype(str))),
+        'state': pd.Categorical(concat_str('Health State ', (np.arange(n_records) % 25).astype(str))),
+        'zip_code': np.char.zfill(idx, 5),
+        'description': concat_str('Comprehensive medical facility ', idx, ' providing quality healthcare services.'),
         
         # Behavioral metrics from your data
-        'mouseMoveCount': behavior_df['mouseMoveCount'].values,
-        'keyPressCount': behavior_df['keyPressCount'].values,
-        'timeOnPageSeconds': behavior_df['timeOnPageSeconds'].values,
-        'mouseMoveRate': behavior_df['mouseMoveRate'].values,
-        'keyPressRate': behavior_df['keyPressRate'].values,
-        'interactionBalance': behavior_df['interactionBalance'].values,
-        'interactionScore': behavior_df['interactionScore'].values,
-        'idleRatio': behavior_df['idleRatio'].values,
-        'behavioral_label': behavior_df['label'].values
+        **{col: behavior[col] for col in BEHAVIOR_COLUMNS if col != 'label'},
+        'behavioral_label': behavior['label']
     }
     
     df = pd.DataFrame(clinic_data)
     
     # Create features
     print("Engineering features...")
-    features = pd.DataFrame()
-    
-    # Basic features
-    features['has_website'] = df['website'].notna().astype(int)
-    features['has_phone'] = df['phone'].notna().astype(int)
-    features['has_license'] = df['license_number'].notna().astype(int)
-    features['has_accreditation'] = df['accreditation'].notna().astype(int)
-    features['years_in_business'] = 2024 - df['year_established']
-    features['number_of_doctors'] = df['number_of_doctors']
-    features['number_of_staff'] = df['number_of_staff']
-    
-    # Behavioral features
-    features['mouseMoveCount'] = df['mouseMoveCount']
-    features['keyPressCount'] = df['keyPressCount']
-    features['timeOnPageSeconds'] = df['timeOnPageSeconds']
-    features['mouseMoveRate'] = df['mouseMoveRate']
-    features['keyPressRate'] = df['keyPressRate']
-    features['interactionBalance'] = df['interactionBalance']
-    features['interactionScore'] = df['interactionScore']
-    features['idleRatio'] = df['idleRatio']
+    # Training only reads these numeric columns, so build them in one pass;
+    # the string profile columns above are only written out to the CSV
+    features = pd.DataFrame({
+        # Basic features
+        'has_website': df['website'].notna().astype(int),
+        'has_phone': df['phone'].notna().astype(int),
+        'has_license': df['license_number'].notna().astype(int),
+        'has_accreditation': df['accreditation'].notna().astype(int),
+        'years_in_business': 2024 - df['year_established'],
+        'number_of_doctors': df['number_of_doctors'],
+        'number_of_staff': df['number_of_staff'],
+        
+        # Behavioral features
+        **{col: behavior[col] for col in BEHAVIOR_COLUMNS if col != 'label'}
+    })
     
     # Create risk scores based on behavioral patterns
     print("Creating risk labels...")
-    risk_scores = []
+    score = np.full(n_records, 0.5)  # Base score
     
-    for i, row in df.iterrows():
-        score = 0.5  # Base score
-        
-        # Behavioral risk factors
-        if row['idleRatio'] > 0.5:  # High idle time
-            score += 0.1
-        if row['interactionScore'] < 0.3:  # Low interaction
-            score += 0.15
-        if row['mouseMoveRate'] < 0.5:  # Low mouse activity
-            score += 0.1
-        
-        # Behavioral protective factors
-        if row['interactionScore'] > 0.7:  # High interaction
-            score -= 0.15
-        if row['timeOnPageSeconds'] > 120:  # Good time spent
-            score -= 0.1
-        
-        # Business legitimacy factors
-        if not row['license_number']:
-            score += 0.2
-        if not row['accreditation']:
-            score += 0.1
-        if not row['website']:
-            score += 0.1
-        
-        # Business maturity factors
-        if row['year_established'] > 2018:  # New business
-            score += 0.15
-        elif row['year_established'] < 2010:  # Established
-            score -= 0.1
-        
-        risk_scores.append(max(0.0, min(1.0, score)))
+    # Behavioral risk factors
+    score += 0.1 * (behavior['idleRatio'] > 0.5)  # High idle time
+    score += 0.15 * (behavior['interactionScore'] < 0.3)  # Low interaction
+    score += 0.1 * (behavior['mouseMoveRate'] < 0.5)  # Low mouse activity
+    
+    # Behavioral protective factors
+    score -= 0.15 * (behavior['interactionScore'] > 0.7)  # High interaction
+    score -= 0.1 * (behavior['timeOnPageSeconds'] > 120)  # Good time spent
+    
+    # Business legitimacy factors
+    score += 0.2 * ~license_mask
+    score += 0.1 * ~accreditation_mask
+    score += 0.1 * ~website_mask
     
-    df['risk_score'] = risk_scores
+    # Business maturity factors
+    year_established = df['year_established'].values
+    score += 0.15 * (year_established > 2018)  # New business
+    score -= 0.1 * (year_established < 2010)  # Established
+    
+    np.clip(score, 0.0, 1.0, out=score)
+    df['risk_score'] = score
     
     # Create risk levels
-    df['risk_level'] = df['risk_score'].apply(
-        lambda x: 'LOW' if x <= 0.3 else ('MEDIUM' if x <= 0.7 else 'HIGH')
+    df['risk_level'] = pd.cut(
+        score, bins=[-0.01, 0.3, 0.7, 1.01], labels=['LOW', 'MEDIUM', 'HIGH']
     )
     
     print(f"Risk distribution:")
     print(df['risk_level'].value_counts())
     
-    # Prepare training data
-    X = features.fillna(0)
+    # Prepare training data; the forest works in float32 internally, so
+    # downcasting here saves it a float64 copy of every fold
+    X = features.fillna(0).astype(np.float32)
     y = df['risk_level']
     
     # Encode labels
     label_encoder = LabelEncoder()
     y_encoded = label_encoder.fit_transform(y)
     
-    # Split data (without stratification due to class imbalance)
+    # Split data, stratified unless a risk level is too rare to appear in both sets
+    stratify = y_encoded if np.bincount(y_encoded).min() >= 2 else None
+    if stratify is None:
+        print("WARNING: a risk level has fewer than 2 samples, splitting without stratification")
+    
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y_encoded, test_size=0.2, random_state=42
+        X, y_encoded, test_size=0.2, random_state=42, stratify=stratify
     )
     
     print(f"Training set: {len(X_train)} samples")
@@ -148,7 +163,15 @@ def main():
     
     # Train model
     print("Training Random Forest model...")
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Balanced class weights and bounded depth/leaf size keep the trees small
+    model = RandomForestClassifier(
+        n_estimators=100,
+        max_depth=12,
+        min_samples_leaf=max(2, len(X_train) // 100),
+        class_weight='balanced_subsample',
+        random_state=42,
+        n_jobs=-1
+    )
     model.fit(X_train, y_train)
     
     # Evaluate
@@ -179,12 +202,27 @@ def main():
         'model_version': '1.0'
     }
     
-    joblib.dump(model_data, '../ml_models/clinic_risk_model.joblib')
+    joblib.dump(model_data, '../ml_models/clinic_risk_model.joblib', compress=('lz4', 3))
     print("Model saved to ml_models/clinic_risk_model.joblib")
     
+    # Export the forest to ONNX so simple_api.py can serve it with onnxruntime
+    onnx_path = '../ml_models/clinic_risk_model.onnx'
+    try:
+        if to_onnx is None:
+            raise ImportError("skl2onnx is not installed")
+        onx = to_onnx(model, X_train.to_numpy(dtype=np.float32)[:1], options={'zipmap': False})
+        with open(onnx_path, 'wb') as f:
+            f.write(onx.SerializeToString())
+        print("ONNX model saved to ml_models/clinic_risk_model.onnx")
+    except Exception as e:
+        print(f"WARNING: ONNX export skipped: {e}")
+        # Don't leave an ONNX file from an older model next to the new one
+        if os.path.exists(onnx_path):
+            os.remove(onnx_path)
+    
     # Save data
-    df.to_csv('../data/combined_training_data.csv', index=False)
-    print("Data saved to data/combined_training_data.csv")
+    df.to_parquet('../data/combined_training_data.parquet', engine='pyarrow', compression='snappy', index=False)
+    print("Data saved to data/combined_training_data.parquet")
     
     # Test with sample
     print("\nTesting with sample data...")
@@ -235,7 +273,7 @@ def main():
     prediction_encoded = model.predict(sample_features)[0]
     prediction_proba = model.predict_proba(sample_features)[0]
     
-    risk_level = label_encoder.inverse_transform([prediction_encoded])[0]
+    risk_level = label_encoder.classes_[prediction_encoded]
     confidence = np.max(prediction_proba)
     
     print(f"Sample prediction result:")
@@ -5,37 +5,133 @@ Trains machine learning models using behavioral metrics and clinic metadata
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 from sklearn.pipeline import Pipeline
 import joblib
+from joblib import Parallel, delayed
 import json
+import os
+import re
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from skl2onnx import to_onnx
+except ImportError:
+    to_onnx = None
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Precompiled patterns used during feature engineering
+DIGIT_RE = re.compile(r'\d')
+PHONE_RE = re.compile(r'^[\+]?[1-9][\d]{0,15}$')
+LICENSE_RE = re.compile(r'^[A-Z0-9]{6,20}$')
+TAX_ID_RE = re.compile(r'^\d{9,12}$')
+PERSONAL_EMAIL_RE = re.compile(r'gmail|yahoo|hotmail|outlook')
+PROFESSIONAL_EMAIL_RE = re.compile(r'clinic|medical|health')
+
+MEDICAL_TERMS = ['medical', 'healthcare', 'patients', 'treatment', 'care', 'professional']
+
+# Raw input columns read by the single-clinic fast path in predict_risk_fast
+TEXT_COLUMNS = [
+    'clinic_name', 'website', 'phone', 'email', 'license_number', 'accreditation', 'tax_id',
+    'address', 'city', 'state', 'zip_code', 'description'
+]
+NUMERIC_COLUMNS = [
+    'year_established', 'number_of_doctors', 'number_of_staff', 'login_frequency',
+    'profile_completion_time', 'data_modification_count', 'session_duration_avg'
+]
+LOCATION_COLUMNS = ['address', 'city', 'state', 'zip_code']
+SERVICE_COLUMNS = ['specialties', 'custom_specialties', 'services', 'custom_services']
+
+# ONNX metadata marking an export of the classifier alone, fed already-scaled features
+ONNX_INPUT_METADATA = ('input', 'scaled')
+
+# Below this many training rows, worker startup costs more than parallel training saves
+PARALLEL_MIN_SAMPLES = 500
+
+# Raw columns read from the training files and the dtypes to read them with
+LABEL_COLUMNS = [
+    'risk_score', 'has_website', 'has_license', 'license_format_valid', 'has_accreditation',
+    'is_new_business', 'is_solo_practice'
+]
+TRAINING_COLUMNS = set(
+    TEXT_COLUMNS + NUMERIC_COLUMNS + SERVICE_COLUMNS + LABEL_COLUMNS
+    + ['submission_timestamp', 'latitude', 'longitude', 'clinic_id', 'id']
+)
+# Raw input fields a prediction depends on (features, risk flags and account status)
+PREDICTION_COLUMNS = sorted(TRAINING_COLUMNS - {'risk_score', 'clinic_id', 'id'})
+TRAINING_DTYPES = {
+    **{col: str for col in TEXT_COLUMNS},
+    # Few distinct values, so category codes are much smaller than strings
+    'city': 'category',
+    'state': 'category',
+    **{col: 'float32' for col in NUMERIC_COLUMNS + ['latitude', 'longitude']}
+}
+
+def _is_missing(value):
+    """True for None and NaN, matching pandas' isna for scalars"""
+    return value is None or (isinstance(value, (float, np.floating)) and np.isnan(value))
+
+def _is_number(value):
+    """True for int/float values that pandas would keep in a numeric column"""
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+def _score_text_quality(lengths, found_terms):
+    """Combine description length and medical term count into a 0-1 score"""
+    score = 0.3 * (lengths > 50)
+    score = score + 0.2 * (lengths > 150)
+    score = score + 0.2 * (lengths > 300)
+    score = score + np.minimum(0.3, found_terms * 0.1)
+    return np.minimum(1.0, score)
+
+def _evaluate_model(model, X_train, y_train, n_jobs):
+    """Cross-validate a pipeline around model, scaling only when it matters"""
+    steps = [('classifier', model)]
+    if not isinstance(model, HistGradientBoostingClassifier):
+        steps.insert(0, ('scaler', StandardScaler()))
+    pipeline = Pipeline(steps)
+    cv_scores = cross_val_score(pipeline, X_train, y_train, cv=5, scoring='f1_weighted', n_jobs=n_jobs)
+    return pipeline, cv_scores.mean()
+
 class ClinicRiskModel:
     def __init__(self):
         self.model = None
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_columns = []
+        self._col_index = {}
+        self._n_features = 0
+        self._onnx_session = None
         self.model_version = "2.0"
+        self.training_date = None
         self.training_data_path = "data/behavior_metrics.csv"
         
     def load_training_data(self):
         """Load behavioral metrics and clinic data for training"""
         try:
             # Load behavioral metrics
-            behavior_df = pd.read_csv(self.training_data_path)
+            behavior_df = self._read_training_file(self.training_data_path)
             print(f"📊 Loaded {len(behavior_df)} behavioral records")
             
             # If we have clinic data, merge it
             try:
-                clinic_df = pd.read_csv("data/clinic_registrations.csv")
+                clinic_df = self._read_training_file("data/clinic_registrations.csv")
                 print(f"🏥 Loaded {len(clinic_df)} clinic records")
                 
                 # Merge datasets on clinic_id or user_id
@@ -55,85 +151,114 @@ class ClinicRiskModel:
             print(f"❌ Error loading training data: {e}")
             return None
     
+    def _read_training_file(self, path):
+        """Read only the columns training uses, with compact dtypes"""
+        if path.endswith('.parquet'):
+            return self._read_training_parquet(path)
+        
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [col for col in header if col in TRAINING_COLUMNS] or None
+        
+        # The C engine parses str columns as text, keeping zero-padded zip codes
+        # and IDs that the pyarrow engine would infer as integers first
+        return pd.read_csv(path, usecols=usecols, dtype=TRAINING_DTYPES)
+    
+    def _read_training_parquet(self, path):
+        """Parquet counterpart of the CSV reader, returning the same columns and dtypes"""
+        df = pd.read_parquet(path)
+        df = df[[col for col in df.columns if col in TRAINING_COLUMNS]]
+        
+        # The CSV reader turns empty strings into NaN; do the same so presence features agree
+        text_cols = [col for col in df.columns if col in TEXT_COLUMNS]
+        df[text_cols] = df[text_cols].replace('', np.nan)
+        
+        # astype(str) turns NaN into 'nan' before pandas 3, so only convert the present values
+        for col in text_cols:
+            df[col] = df[col].astype(str).where(df[col].notna())
+        return df.astype({
+            col: dtype for col, dtype in TRAINING_DTYPES.items()
+            if col in df.columns and dtype is not str
+        })
+    
     def engineer_features(self, df):
         """Engineer features from raw behavioral and clinic data"""
         print("🔧 Engineering features...")
         
-        features = pd.DataFrame()
+        # Collect columns in a dict and build the DataFrame once at the end
+        features = {}
         
         # 1. Submission Pattern Features
         if 'submission_timestamp' in df.columns:
-            df['submission_timestamp'] = pd.to_datetime(df['submission_timestamp'])
-            df['submission_hour'] = df['submission_timestamp'].dt.hour
-            df['submission_day_of_week'] = df['submission_timestamp'].dt.dayofweek
-            df['is_weekend_submission'] = df['submission_day_of_week'].isin([5, 6]).astype(int)
-            df['is_business_hours'] = df['submission_hour'].between(9, 17).astype(int)
-            df['is_late_night'] = df['submission_hour'].between(22, 6).astype(int)
+            # Timestamps are ISO 8601 strings; parse them once with the fast path
+            timestamps = pd.to_datetime(df['submission_timestamp'], format='ISO8601', cache=True, errors='coerce')
+            submission_hour = timestamps.dt.hour
+            submission_day_of_week = timestamps.dt.dayofweek
             
-            features['submission_hour'] = df['submission_hour']
-            features['submission_day_of_week'] = df['submission_day_of_week']
-            features['is_weekend_submission'] = df['is_weekend_submission']
-            features['is_business_hours'] = df['is_business_hours']
-            features['is_late_night'] = df['is_late_night']
+            features['submission_hour'] = submission_hour
+            features['submission_day_of_week'] = submission_day_of_week
+            features['is_weekend_submission'] = submission_day_of_week.isin([5, 6]).astype(int)
+            features['is_business_hours'] = submission_hour.between(9, 17).astype(int)
+            features['is_late_night'] = submission_hour.between(22, 6).astype(int)
         
         # 2. Clinic Information Features
         if 'clinic_name' in df.columns:
             features['clinic_name_length'] = df['clinic_name'].fillna('').str.len()
-            features['has_numbers_in_name'] = df['clinic_name'].fillna('').str.contains(r'\d').astype(int)
+            features['has_numbers_in_name'] = df['clinic_name'].fillna('').str.contains(DIGIT_RE).astype(int)
         
         if 'website' in df.columns:
-            features['has_website'] = df['website'].notna().astype(int)
-            features['website_length'] = df['website'].fillna('').str.len()
+            features['has_website'], features['website_length'] = self._presence_and_length(df['website'])
             
         if 'phone' in df.columns:
-            features['has_phone'] = df['phone'].notna().astype(int)
-            features['phone_length'] = df['phone'].fillna('').str.len()
-            features['phone_is_valid'] = df['phone'].fillna('').str.match(r'^[\+]?[1-9][\d]{0,15}$').astype(int)
+            features['has_phone'], features['phone_length'] = self._presence_and_length(df['phone'])
+            features['phone_is_valid'] = df['phone'].fillna('').str.match(PHONE_RE).astype(int)
         
         if 'email' in df.columns:
             features['email_length'] = df['email'].fillna('').str.len()
-            features['email_domain_type'] = df['email'].fillna('').apply(self._classify_email_domain)
+            features['email_domain_type'] = self._classify_email_domain(df['email'].fillna(''))
         
         # 3. License and Accreditation Features
         if 'license_number' in df.columns:
-            features['has_license'] = df['license_number'].notna().astype(int)
-            features['license_length'] = df['license_number'].fillna('').str.len()
-            features['license_format_valid'] = df['license_number'].fillna('').str.match(r'^[A-Z0-9]{6,20}$').astype(int)
+            features['has_license'], features['license_length'] = self._presence_and_length(df['license_number'])
+            features['license_format_valid'] = df['license_number'].fillna('').str.match(LICENSE_RE).astype(int)
         
         if 'accreditation' in df.columns:
-            features['has_accreditation'] = df['accreditation'].notna().astype(int)
-            features['accreditation_length'] = df['accreditation'].fillna('').str.len()
+            features['has_accreditation'], features['accreditation_length'] = self._presence_and_length(df['accreditation'])
         
         if 'tax_id' in df.columns:
             features['has_tax_id'] = df['tax_id'].notna().astype(int)
-            features['tax_id_format_valid'] = df['tax_id'].fillna('').str.match(r'^\d{9,12}$').astype(int)
+            features['tax_id_format_valid'] = df['tax_id'].fillna('').str.match(TAX_ID_RE).astype(int)
         
         # 4. Location Features
-        location_cols = ['address', 'city', 'state', 'zip_code']
+        location_cols = LOCATION_COLUMNS
         for col in location_cols:
             if col in df.columns:
-                features[f'has_{col}'] = df[col].notna().astype(int)
-                features[f'{col}_length'] = df[col].fillna('').str.len()
+                features[f'has_{col}'], features[f'{col}_length'] = self._presence_and_length(df[col])
         
         if all(col in df.columns for col in location_cols):
-            features['address_completeness'] = df[location_cols].notna().sum(axis=1) / len(location_cols)
+            present = df[location_cols].notna().to_numpy()
+            features['address_completeness'] = present.sum(axis=1, dtype=np.float32) * np.float32(1.0 / len(location_cols))
         
         if 'latitude' in df.columns and 'longitude' in df.columns:
-            features['has_coordinates'] = df[['latitude', 'longitude']].notna().all(axis=1).astype(int)
+            features['has_coordinates'] = df[['latitude', 'longitude']].notna().to_numpy().all(axis=1).astype(np.uint8)
         
         # 5. Business Maturity Features
         if 'year_established' in df.columns:
             current_year = datetime.now().year
-            df['years_in_business'] = current_year - df['year_established'].fillna(current_year)
-            features['years_in_business'] = df['years_in_business']
-            features['is_new_business'] = (df['years_in_business'] < 1).astype(int)
-            features['is_established'] = (df['years_in_business'] >= 5).astype(int)
+            # float32 holds every whole year exactly and avoids int overflow on bad input
+            years_in_business = np.float32(current_year) - df['year_established'].to_numpy(
+                dtype=np.float32, na_value=current_year
+            )
+            df['years_in_business'] = years_in_business
+            features['years_in_business'] = years_in_business
+            features['is_new_business'] = (years_in_business < 1).view(np.uint8)
+            features['is_established'] = (years_in_business >= 5).view(np.uint8)
         
         # 6. Scale Features
         if 'number_of_doctors' in df.columns:
-            features['number_of_doctors'] = df['number_of_doctors'].fillna(1)
-            features['is_solo_practice'] = (df['number_of_doctors'] == 1).astype(int)
-            features['is_large_clinic'] = (df['number_of_doctors'] > 10).astype(int)
+            doctors = df['number_of_doctors'].to_numpy(dtype=np.float32, na_value=np.nan)
+            features['number_of_doctors'] = np.where(np.isnan(doctors), np.float32(1), doctors)
+            features['is_solo_practice'] = (doctors == 1).view(np.uint8)
+            features['is_large_clinic'] = (doctors > 10).view(np.uint8)
         
         if 'number_of_staff' in df.columns:
             features['number_of_staff'] = df['number_of_staff'].fillna(0)
@@ -141,11 +266,14 @@ class ClinicRiskModel:
                 features['doctor_to_staff_ratio'] = df['number_of_staff'] / df['number_of_doctors'].replace(0, 1)
         
         # 7. Service Features
-        service_cols = ['specialties', 'custom_specialties', 'services', 'custom_services']
+        service_cols = SERVICE_COLUMNS
         for col in service_cols:
             if col in df.columns:
                 # Count array items (assuming JSON-like format)
-                features[f'{col}_count'] = df[col].fillna('[]').apply(self._count_array_items)
+                values = df[col].fillna('[]').to_numpy()
+                features[f'{col}_count'] = np.fromiter(
+                    (self._count_array_items(value) for value in values), dtype=np.int32, count=len(values)
+                )
         
         if all(col in df.columns for col in ['specialties', 'custom_specialties']):
             features['total_specialties'] = features['specialties_count'] + features['custom_specialties_count']
@@ -172,58 +300,61 @@ class ClinicRiskModel:
         if 'description' in df.columns:
             features['description_length'] = df['description'].fillna('').str.len()
             features['has_description'] = (df['description'].fillna('').str.len() > 0).astype(int)
-            features['description_quality'] = df['description'].fillna('').apply(self._calculate_text_quality)
+            features['description_quality'] = self._calculate_text_quality(df['description'].fillna(''))
         
+        features = pd.DataFrame(features, index=df.index)
         print(f"✅ Engineered {len(features.columns)} features")
         return features
     
-    def _classify_email_domain(self, email):
-        """Classify email domain type"""
-        if not isinstance(email, str) or '@' not in email:
-            return 'unknown'
-        
-        domain = email.split('@')[1].lower()
-        
-        if any(provider in domain for provider in ['gmail', 'yahoo', 'hotmail', 'outlook']):
-            return 'personal'
-        elif any(provider in domain for provider in ['clinic', 'medical', 'health']):
-            return 'professional'
-        else:
-            return 'business'
+    def _presence_and_length(self, values):
+        """notna() flag and string length (0 when missing) for a text column"""
+        present = values.notna().to_numpy()
+        if not present.any():
+            # An all-null column may not be string typed, so skip the .str accessor
+            return present.astype(int), np.zeros(len(values), dtype=np.int64)
+        
+        # str.len() already yields NaN for missing values, so no fillna('') copy is needed
+        return present.astype(int), values.str.len().to_numpy(dtype=np.int64, na_value=0)
+    
+    def _classify_email_domain(self, emails):
+        """Classify email domain type for a Series of emails"""
+        # Text between the first and second '@' (NaN when there is none)
+        domains = emails.str.extract(r'@([^@]*)', expand=False).str.lower()
+        
+        return pd.Series(np.select(
+            [
+                domains.isna(),
+                domains.str.contains(PERSONAL_EMAIL_RE, na=False),
+                domains.str.contains(PROFESSIONAL_EMAIL_RE, na=False)
+            ],
+            ['unknown', 'personal', 'professional'],
+            default='business'
+        ), index=emails.index)
     
     def _count_array_items(self, array_str):
         """Count items in JSON array string"""
-        try:
-            if pd.isna(array_str) or array_str == '':
+        if isinstance(array_str, str):
+            if not array_str:
                 return 0
-            if isinstance(array_str, str):
-                import json
-                return len(json.loads(array_str))
-            return len(array_str) if hasattr(array_str, '__len__') else 0
-        except:
-            return 0
-    
-    def _calculate_text_quality(self, text):
-        """Calculate text quality score"""
-        if not isinstance(text, str) or len(text) == 0:
-            return 0.0
-        
-        score = 0.0
-        
-        # Length scoring
-        if len(text) > 50:
-            score += 0.3
-        if len(text) > 150:
-            score += 0.2
-        if len(text) > 300:
-            score += 0.2
+            try:
+                return len(_json_loads(array_str))
+            except (TypeError, ValueError):
+                return 0
+        return len(array_str) if hasattr(array_str, '__len__') else 0
+    
+    def _calculate_text_quality(self, texts):
+        """Calculate text quality scores for a Series of texts"""
+        lengths = texts.str.len().fillna(0).to_numpy()
+        # Non-string descriptions (numbers, lists) become '' rather than NaN, so they find no terms
+        lowered = texts.astype('string').str.lower().fillna('')
         
         # Content quality indicators
-        medical_terms = ['medical', 'healthcare', 'patients', 'treatment', 'care', 'professional']
-        found_terms = sum(1 for term in medical_terms if term.lower() in text.lower())
-        score += min(0.3, found_terms * 0.1)
+        found_terms = np.fromiter(
+            (sum(term in text for term in MEDICAL_TERMS) for text in lowered.to_numpy()),
+            dtype=np.int64, count=len(lowered)
+        )
         
-        return min(1.0, score)
+        return _score_text_quality(lengths, found_terms)
     
     def prepare_labels(self, df):
         """Prepare target labels for supervised learning"""
@@ -251,34 +382,36 @@ class ClinicRiskModel:
     
     def _create_synthetic_risk_scores(self, df):
         """Create synthetic risk scores for demonstration"""
-        scores = []
-        
-        for _, row in df.iterrows():
-            score = 0.5  # Base score
-            
-            # Risk factors (increase score)
-            if not row.get('has_license', True):
-                score += 0.2
-            if not row.get('has_website', True):
-                score += 0.1
-            if row.get('is_new_business', False):
-                score += 0.15
-            if row.get('is_solo_practice', False):
-                score += 0.1
-            if not row.get('has_accreditation', True):
-                score += 0.1
-            
-            # Protective factors (decrease score)
-            if row.get('years_in_business', 0) > 5:
-                score -= 0.1
-            if row.get('has_accreditation', False):
-                score -= 0.1
-            if row.get('license_format_valid', False):
-                score -= 0.15
-            
-            scores.append(max(0.0, min(1.0, score)))
-        
-        return np.array(scores)
+        score = np.full(len(df), 0.5)  # Base score
+        
+        has_license = self._column_truthy(df, 'has_license', True)
+        has_accreditation = self._column_truthy(df, 'has_accreditation', True)
+        
+        # Risk factors (increase score)
+        score += 0.2 * ~has_license
+        score += 0.1 * ~self._column_truthy(df, 'has_website', True)
+        score += 0.15 * self._column_truthy(df, 'is_new_business', False)
+        score += 0.1 * self._column_truthy(df, 'is_solo_practice', False)
+        score += 0.1 * ~has_accreditation
+        
+        # Protective factors (decrease score)
+        if 'years_in_business' in df.columns:
+            score -= 0.1 * (df['years_in_business'].to_numpy(dtype=float) > 5)
+        if 'has_accreditation' in df.columns:
+            score -= 0.1 * has_accreditation
+        score -= 0.15 * self._column_truthy(df, 'license_format_valid', False)
+        
+        return np.clip(score, 0.0, 1.0)
+    
+    def _column_truthy(self, df, col, default):
+        """Truthiness of each value in a column, or a constant if the column is missing"""
+        if col not in df.columns:
+            return np.full(len(df), default, dtype=bool)
+        
+        values = df[col].to_numpy()
+        if values.dtype.kind in 'biuf':
+            return values != 0
+        return np.fromiter(map(bool, values), dtype=bool, count=len(values))
     
     def train_model(self, test_size=0.2, random_state=42):
         """Train the risk assessment model"""
@@ -295,23 +428,37 @@ class ClinicRiskModel:
         y, risk_scores = self.prepare_labels(df)
         
         # Store feature columns
-        self.feature_columns = X.columns.tolist()
+        self._set_feature_columns(X.columns.tolist())
         
         # Handle categorical variables
         X_encoded = self._encode_categorical_features(X)
         
-        # Split data
+        # Split data, stratified unless a risk level is too rare to appear in both sets
+        stratify = y if pd.Series(y).value_counts().min() >= 2 else None
+        if stratify is None:
+            print("⚠️ A risk level has fewer than 2 samples, splitting without stratification")
+        
         X_train, X_test, y_train, y_test = train_test_split(
-            X_encoded, y, test_size=test_size, random_state=random_state, stratify=y
+            X_encoded, y, test_size=test_size, random_state=random_state, stratify=stratify
         )
         
         print(f"📊 Training set: {len(X_train)} samples")
         print(f"📊 Test set: {len(X_test)} samples")
         
+        # Fan out across cores only when there is enough data to pay for the workers
+        n_jobs = -1 if len(X_train) > PARALLEL_MIN_SAMPLES else 1
+        
         # Try multiple models
         models = {
-            'RandomForest': RandomForestClassifier(n_estimators=100, random_state=random_state),
-            'GradientBoosting': GradientBoostingClassifier(random_state=random_state),
+            'RandomForest': RandomForestClassifier(
+                n_estimators=100,
+                max_depth=12,
+                max_features='sqrt',
+                min_samples_leaf=max(2, len(X_train) // 100),
+                random_state=random_state,
+                n_jobs=n_jobs
+            ),
+            'HistGradientBoosting': HistGradientBoostingClassifier(max_iter=200, random_state=random_state),
             'LogisticRegression': LogisticRegression(random_state=random_state, max_iter=1000)
         }
         
@@ -319,19 +466,18 @@ class ClinicRiskModel:
         best_score = 0
         best_name = ""
         
-        for name, model in models.items():
-            print(f"\n🔍 Training {name}...")
-            
-            # Create pipeline with scaling
-            pipeline = Pipeline([
-                ('scaler', StandardScaler()),
-                ('classifier', model)
-            ])
-            
-            # Cross-validation
-            cv_scores = cross_val_score(pipeline, X_train, y_train, cv=5, scoring='f1_weighted')
-            avg_score = cv_scores.mean()
-            
+        # Evaluate the candidates concurrently, splitting the cores between them
+        print(f"\n🔍 Training {', '.join(models)}...")
+        if n_jobs == 1:
+            model_jobs, cv_jobs = 1, 1
+        else:
+            model_jobs, cv_jobs = len(models), max(1, (os.cpu_count() or 1) // len(models))
+        results = Parallel(n_jobs=model_jobs)(
+            delayed(_evaluate_model)(model, X_train, y_train, cv_jobs)
+            for model in models.values()
+        )
+        
+        for name, (pipeline, avg_score) in zip(models, results):
             print(f"📈 {name} CV Score: {avg_score:.3f}")
             
             if avg_score > best_score:
@@ -357,9 +503,16 @@ class ClinicRiskModel:
             )
         
         self.model = best_model
+        self._onnx_session = None
         print("✅ Model training completed successfully!")
         return True
     
+    def _set_feature_columns(self, feature_columns):
+        """Store training feature order and its column -> position index"""
+        self.feature_columns = list(feature_columns)
+        self._col_index = {col: i for i, col in enumerate(self.feature_columns)}
+        self._n_features = len(self.feature_columns)
+    
     def _encode_categorical_features(self, X):
         """Encode categorical features"""
         X_encoded = X.copy()
@@ -367,11 +520,15 @@ class ClinicRiskModel:
         categorical_cols = X_encoded.select_dtypes(include=['object']).columns
         
         for col in categorical_cols:
+            values = X_encoded[col].fillna('unknown')
             if col not in self.label_encoders:
-                self.label_encoders[col] = LabelEncoder()
-                X_encoded[col] = self.label_encoders[col].fit_transform(X_encoded[col].fillna('unknown'))
+                # Sorted categories give the same codes LabelEncoder used to
+                cat = pd.Categorical(values)
+                self.label_encoders[col] = cat.categories
             else:
-                X_encoded[col] = self.label_encoders[col].transform(X_encoded[col].fillna('unknown'))
+                # Values not seen during training get the reserved code -1
+                cat = pd.Categorical(values, categories=self.label_encoders[col])
+            X_encoded[col] = cat.codes
         
         return X_encoded.fillna(0)
     
@@ -388,62 +545,279 @@ class ClinicRiskModel:
     
     def predict_risk(self, clinic_data):
         """Predict risk for new clinic data"""
+        if isinstance(clinic_data, dict):
+            return self.predict_risk_fast(clinic_data)
+        
+        results = self.predict_risk_batch(clinic_data)
+        return results[0] if results else None
+    
+    def predict_risk_fast(self, clinic_data):
+        """Predict risk for a single clinic dict without building a DataFrame"""
         if self.model is None:
             print("❌ Model not trained. Call train_model() first.")
             return None
         
         try:
-            # Convert to DataFrame if needed
-            if isinstance(clinic_data, dict):
-                df = pd.DataFrame([clinic_data])
-            else:
-                df = clinic_data.copy()
-            
-            # Engineer features
-            X = self.engineer_features(df)
-            
-            # Ensure all expected columns are present
-            for col in self.feature_columns:
-                if col not in X.columns:
-                    X[col] = 0
-            
-            # Select only training columns
-            X = X[self.feature_columns]
-            
-            # Encode categorical features
-            X_encoded = self._encode_categorical_features(X)
-            
-            # Make prediction
-            risk_level = self.model.predict(X_encoded)[0]
-            risk_proba = self.model.predict_proba(X_encoded)[0]
+            features = self._engineer_clinic_features(clinic_data)
+            if features is None:
+                # Inputs the fast path can't mirror exactly go through pandas
+                results = self.predict_risk_batch([clinic_data])
+                return results[0] if results else None
             
-            # Get risk score (probability of HIGH/MEDIUM risk)
-            high_prob = risk_proba[2] if len(risk_proba) > 2 else 0  # HIGH risk probability
-            medium_prob = risk_proba[1] if len(risk_proba) > 1 else 0  # MEDIUM risk probability
-            risk_score = high_prob * 0.7 + medium_prob * 0.3  # Weighted score
+            X_matrix = np.zeros((1, self._n_features))
+            self._fill_feature_row(X_matrix[0], features)
             
-            # Generate risk flags
-            risk_flags = self._generate_risk_flags(df.iloc[0])
+            return self._score_feature_matrix(X_matrix, [clinic_data])[0]
             
-            # Recommend account status
-            account_status = self._recommend_account_status(risk_score, risk_level, df.iloc[0])
+        except Exception as e:
+            print(f"❌ Error making prediction: {e}")
+            return None
+    
+    def _engineer_clinic_features(self, clinic):
+        """Scalar version of engineer_features for one clinic (None if unsupported)"""
+        if 'submission_timestamp' in clinic:
+            return None
+        
+        text = {}
+        for col in TEXT_COLUMNS:
+            if col in clinic:
+                value = clinic[col]
+                if _is_missing(value):
+                    text[col] = None
+                elif isinstance(value, str):
+                    text[col] = value
+                else:
+                    return None
+        
+        numbers = {}
+        for col in NUMERIC_COLUMNS:
+            if col in clinic:
+                value = clinic[col]
+                if _is_missing(value):
+                    numbers[col] = None
+                elif _is_number(value):
+                    numbers[col] = value
+                else:
+                    return None
+        
+        features = {}
+        
+        # Clinic information
+        if 'clinic_name' in text:
+            name = text['clinic_name'] or ''
+            features['clinic_name_length'] = len(name)
+            features['has_numbers_in_name'] = int(DIGIT_RE.search(name) is not None)
+        
+        if 'website' in text:
+            features['has_website'] = int(text['website'] is not None)
+            features['website_length'] = len(text['website'] or '')
+        
+        if 'phone' in text:
+            phone = text['phone'] or ''
+            features['has_phone'] = int(text['phone'] is not None)
+            features['phone_length'] = len(phone)
+            features['phone_is_valid'] = int(PHONE_RE.match(phone) is not None)
+        
+        if 'email' in text:
+            email = text['email'] or ''
+            features['email_length'] = len(email)
+            if 'email_domain_type' in self._col_index:
+                categories = self.label_encoders.get('email_domain_type')
+                if categories is None:
+                    return None
+                domain_type = self._classify_email(email)
+                features['email_domain_type'] = categories.get_loc(domain_type) if domain_type in categories else -1
+        
+        # License and accreditation
+        if 'license_number' in text:
+            license_number = text['license_number'] or ''
+            features['has_license'] = int(text['license_number'] is not None)
+            features['license_length'] = len(license_number)
+            features['license_format_valid'] = int(LICENSE_RE.match(license_number) is not None)
+        
+        if 'accreditation' in text:
+            features['has_accreditation'] = int(text['accreditation'] is not None)
+            features['accreditation_length'] = len(text['accreditation'] or '')
+        
+        if 'tax_id' in text:
+            features['has_tax_id'] = int(text['tax_id'] is not None)
+            features['tax_id_format_valid'] = int(TAX_ID_RE.match(text['tax_id'] or '') is not None)
+        
+        # Location
+        for col in LOCATION_COLUMNS:
+            if col in text:
+                features[f'has_{col}'] = int(text[col] is not None)
+                features[f'{col}_length'] = len(text[col] or '')
+        
+        if all(col in text for col in LOCATION_COLUMNS):
+            features['address_completeness'] = sum(text[col] is not None for col in LOCATION_COLUMNS) / len(LOCATION_COLUMNS)
+        
+        if 'latitude' in clinic and 'longitude' in clinic:
+            features['has_coordinates'] = int(not _is_missing(clinic['latitude']) and not _is_missing(clinic['longitude']))
+        
+        # Business maturity
+        if 'year_established' in numbers:
+            current_year = datetime.now().year
+            year = numbers['year_established']
+            years_in_business = current_year - (current_year if year is None else year)
+            features['years_in_business'] = years_in_business
+            features['is_new_business'] = int(years_in_business < 1)
+            features['is_established'] = int(years_in_business >= 5)
+        
+        # Scale
+        doctors = numbers.get('number_of_doctors')
+        if 'number_of_doctors' in numbers:
+            features['number_of_doctors'] = 1 if doctors is None else doctors
+            features['is_solo_practice'] = int(doctors is not None and doctors == 1)
+            features['is_large_clinic'] = int(doctors is not None and doctors > 10)
+        
+        if 'number_of_staff' in numbers:
+            staff = numbers['number_of_staff']
+            features['number_of_staff'] = 0 if staff is None else staff
+            if 'number_of_doctors' in numbers:
+                if staff is None or doctors is None:
+                    return None
+                features['doctor_to_staff_ratio'] = staff / (1 if doctors == 0 else doctors)
+        
+        # Services
+        for col in SERVICE_COLUMNS:
+            if col in clinic:
+                value = clinic[col]
+                features[f'{col}_count'] = self._count_array_items('[]' if _is_missing(value) else value)
+        
+        if 'specialties' in clinic and 'custom_specialties' in clinic:
+            features['total_specialties'] = features['specialties_count'] + features['custom_specialties_count']
+            features['has_custom_specialties'] = int(features['custom_specialties_count'] > 0)
+        
+        # Behavioral metrics
+        for col, flag, is_flagged in (
+            ('login_frequency', 'is_active_user', lambda v: v > 5),
+            ('profile_completion_time', 'completed_profile_quickly', lambda v: v < 300),
+            ('data_modification_count', 'frequent_modifications', lambda v: v > 10),
+            ('session_duration_avg', 'long_sessions', lambda v: v > 1800)
+        ):
+            if col in numbers:
+                value = numbers[col]
+                features[col] = value
+                features[flag] = int(value is not None and is_flagged(value))
+        
+        # Text quality
+        if 'description' in text:
+            description = text['description'] or ''
+            lowered = description.lower()
+            features['description_length'] = len(description)
+            features['has_description'] = int(len(description) > 0)
+            features['description_quality'] = float(_score_text_quality(
+                len(description), sum(term in lowered for term in MEDICAL_TERMS)
+            ))
+        
+        return features
+    
+    def _classify_email(self, email):
+        """Scalar version of _classify_email_domain"""
+        parts = email.split('@')
+        if len(parts) < 2:
+            return 'unknown'
+        
+        domain = parts[1].lower()
+        if PERSONAL_EMAIL_RE.search(domain):
+            return 'personal'
+        elif PROFESSIONAL_EMAIL_RE.search(domain):
+            return 'professional'
+        return 'business'
+    
+    def predict_risk_batch(self, clinics):
+        """Predict risk for a batch of clinics with a single model call"""
+        if self.model is None:
+            print("❌ Model not trained. Call train_model() first.")
+            return None
+        
+        try:
+            if isinstance(clinics, pd.DataFrame):
+                # Every row has the same columns, so the vectorized path scores rows independently
+                return self._score_feature_matrix(self._frame_feature_matrix(clinics.copy()), clinics.to_dict('records'))
             
-            result = {
-                'risk_score': float(risk_score),
-                'risk_level': risk_level,
-                'account_status': account_status,
-                'risk_flags': risk_flags,
-                'confidence': float(np.max(risk_proba)),
-                'model_version': self.model_version,
-                'prediction_timestamp': datetime.now().isoformat()
-            }
+            # Engineer each clinic on its own: in a shared DataFrame a clinic would get NaN
+            # (scored as an explicit null) for every key some other clinic sent
+            clinics = list(clinics)
+            X_matrix = np.zeros((len(clinics), self._n_features))
+            for i, clinic in enumerate(clinics):
+                features = self._engineer_clinic_features(clinic)
+                if features is None:
+                    # Inputs the fast path can't mirror exactly go through pandas, one clinic at a time
+                    X_matrix[i] = self._frame_feature_matrix(pd.DataFrame([clinic]))[0]
+                else:
+                    self._fill_feature_row(X_matrix[i], features)
             
-            return result
+            return self._score_feature_matrix(X_matrix, clinics)
             
         except Exception as e:
             print(f"❌ Error making prediction: {e}")
             return None
     
+    def _fill_feature_row(self, row, features):
+        """Place fast-path features into a matrix row in training column order; missing ones stay 0"""
+        for col, value in features.items():
+            idx = self._col_index.get(col)
+            if idx is not None and not _is_missing(value):
+                row[idx] = value
+    
+    def _frame_feature_matrix(self, df):
+        """Encoded feature matrix for a DataFrame of clinics, in training column order"""
+        X = self.engineer_features(df)
+        
+        # Keep only training columns and encode categorical features
+        X = X[[col for col in X.columns if col in self._col_index]]
+        
+        # Numeric inputs that were all null arrive as object columns; don't label encode them
+        for col in X.select_dtypes(include=['object']).columns.difference(list(self.label_encoders)):
+            X[col] = pd.to_numeric(X[col], errors='coerce')
+        X_encoded = self._encode_categorical_features(X)
+        
+        # Missing features stay 0
+        X_matrix = np.zeros((len(df), self._n_features))
+        for col in X_encoded.columns:
+            X_matrix[:, self._col_index[col]] = X_encoded[col].to_numpy()
+        return X_matrix
+    
+    def _score_feature_matrix(self, X_matrix, rows):
+        """Run the model on an encoded feature matrix and build one result per row"""
+        n_rows = len(X_matrix)
+        
+        # Make predictions for the whole batch at once
+        if self._onnx_session is not None:
+            # Scaling stays in scikit-learn (float64); only the classifier runs in onnxruntime
+            X_scaled = self.model[:-1].transform(X_matrix) if len(self.model.steps) > 1 else X_matrix
+            risk_probas = self._onnx_session.run(
+                [self._onnx_proba_output], {self._onnx_input: X_scaled.astype(self._onnx_dtype)}
+            )[0]
+        else:
+            risk_probas = self.model.predict_proba(X_matrix)
+        risk_levels = self.model.classes_[risk_probas.argmax(axis=1)]
+        
+        # Get risk scores (probability of HIGH/MEDIUM risk)
+        n_classes = risk_probas.shape[1]
+        high_probs = risk_probas[:, 2] if n_classes > 2 else np.zeros(n_rows)  # HIGH risk probability
+        medium_probs = risk_probas[:, 1] if n_classes > 1 else np.zeros(n_rows)  # MEDIUM risk probability
+        risk_scores = high_probs * 0.7 + medium_probs * 0.3  # Weighted score
+        confidences = risk_probas.max(axis=1)
+        
+        prediction_timestamp = datetime.now().isoformat()
+        results = []
+        
+        for row, risk_level, risk_score, confidence in zip(rows, risk_levels, risk_scores, confidences):
+            results.append({
+                'risk_score': float(risk_score),
+                'risk_level': risk_level,
+                'account_status': self._recommend_account_status(risk_score, risk_level, row),
+                'risk_flags': self._generate_risk_flags(row),
+                'confidence': float(confidence),
+                'model_version': self.model_version,
+                'prediction_timestamp': prediction_timestamp
+            })
+        
+        return results
+    
     def _generate_risk_flags(self, clinic_data):
         """Generate risk flags based on clinic data"""
         flags = []
@@ -488,8 +862,9 @@ class ClinicRiskModel:
                 'training_date': datetime.now().isoformat()
             }
             
-            joblib.dump(model_data, filepath)
+            joblib.dump(model_data, filepath, compress=('lz4', 3))
             print(f"✅ Model saved to {filepath}")
+            self._export_onnx(filepath)
             return True
             
         except Exception as e:
@@ -502,18 +877,75 @@ class ClinicRiskModel:
             model_data = joblib.load(filepath)
             self.model = model_data['model']
             self.scaler = model_data['scaler']
-            self.label_encoders = model_data['label_encoders']
-            self.feature_columns = model_data['feature_columns']
+            # Older models stored fitted LabelEncoders; keep just their categories
+            self.label_encoders = {
+                col: pd.Index(getattr(encoder, 'classes_', encoder))
+                for col, encoder in model_data['label_encoders'].items()
+            }
+            self._set_feature_columns(model_data['feature_columns'])
             self.model_version = model_data.get('model_version', '1.0')
+            self.training_date = model_data.get('training_date')
+            self._load_onnx_session(filepath)
             
             print(f"✅ Model loaded from {filepath}")
             print(f"📊 Model version: {self.model_version}")
-            print(f"📊 Training date: {model_data.get('training_date', 'Unknown')}")
+            print(f"📊 Training date: {self.training_date or 'Unknown'}")
             return True
             
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             return False
+    
+    def _export_onnx(self, filepath):
+        """Export the fitted pipeline to ONNX alongside the joblib file"""
+        onnx_path = os.path.splitext(filepath)[0] + '.onnx'
+        
+        if to_onnx is None:
+            # Don't leave an ONNX file from an older model next to the new one
+            if os.path.exists(onnx_path):
+                os.remove(onnx_path)
+            return
+        
+        try:
+            # Export only the classifier: a float32 graph would round the scaler's output
+            # before the trees see it. Forests compare float32 features in scikit-learn too,
+            # so they take float32 input; other classifiers keep float64
+            classifier = self.model.named_steps['classifier']
+            dtype = np.float32 if isinstance(classifier, RandomForestClassifier) else np.float64
+            sample = np.zeros((1, self._n_features), dtype=dtype)
+            onx = to_onnx(classifier, sample, options={'zipmap': False})
+            onx.metadata_props.add(key=ONNX_INPUT_METADATA[0], value=ONNX_INPUT_METADATA[1])
+            with open(onnx_path, 'wb') as f:
+                f.write(onx.SerializeToString())
+            print(f"✅ ONNX model saved to {onnx_path}")
+        except Exception as e:
+            print(f"⚠️ ONNX export skipped: {e}")
+            if os.path.exists(onnx_path):
+                os.remove(onnx_path)
+    
+    def _load_onnx_session(self, filepath):
+        """Use the exported ONNX model for inference when onnxruntime is available"""
+        self._onnx_session = None
+        onnx_path = os.path.splitext(filepath)[0] + '.onnx'
+        
+        if onnxruntime is None or not os.path.exists(onnx_path):
+            return
+        
+        try:
+            session = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+            metadata = session.get_modelmeta().custom_metadata_map
+            if metadata.get(ONNX_INPUT_METADATA[0]) != ONNX_INPUT_METADATA[1]:
+                # Older exports ran the scaler in float32, shifting risk scores by up to ~1e-2
+                print(f"⚠️ {onnx_path} is an older full-pipeline export, using scikit-learn")
+                return
+            onnx_input = session.get_inputs()[0]
+            self._onnx_input = onnx_input.name
+            self._onnx_dtype = np.float32 if onnx_input.type == 'tensor(float)' else np.float64
+            self._onnx_proba_output = session.get_outputs()[1].name
+            self._onnx_session = session
+            print(f"📊 Using ONNX runtime model from {onnx_path}")
+        except Exception as e:
+            print(f"⚠️ Could not load ONNX model, using scikit-learn: {e}")
 
 def main():
     """Main training and evaluation script"""
@@ -0,0 +1,81 @@
+"""
+Shared pytest fixtures for the clinic risk model tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clinic_risk_model import ClinicRiskModel
+
+
+def make_training_frame(n_rows=300, seed=0):
+    """Synthetic clinic registrations with a risk_score label"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_rows)
+    has_website = rng.random(n_rows) > 0.3
+    has_license = rng.random(n_rows) > 0.2
+
+    return pd.DataFrame({
+        'clinic_id': [f'clinic_{i:04d}' for i in ids],
+        'clinic_name': [f'Medical Center {i}' for i in ids],
+        'website': np.where(has_website, [f'https://clinic{i}.com' for i in ids], None),
+        'phone': [f'+1555{i:07d}' for i in ids],
+        'email': np.where(rng.random(n_rows) > 0.5,
+                          [f'clinic{i}@healthcare.com' for i in ids],
+                          [f'owner{i}@gmail.com' for i in ids]),
+        'license_number': np.where(has_license, [f'LIC{i:06d}' for i in ids], None),
+        'year_established': rng.integers(1980, 2025, n_rows),
+        'number_of_doctors': rng.integers(1, 30, n_rows),
+        'number_of_staff': rng.integers(1, 100, n_rows),
+        'city': rng.choice(['Manila', 'Cebu', 'Davao'], n_rows),
+        'state': rng.choice(['NCR', 'Central Visayas', 'Davao Region'], n_rows),
+        'zip_code': [f'{i % 1000:04d}' for i in ids],
+        'description': rng.choice([
+            'Comprehensive medical facility providing quality healthcare services.',
+            'Professional care for patients.',
+            ''
+        ], n_rows),
+        'submission_timestamp': pd.date_range('2024-01-01', periods=n_rows, freq='7h').strftime('%Y-%m-%dT%H:%M:%S'),
+        'risk_score': np.clip(0.5 - 0.3 * has_license - 0.2 * has_website + rng.normal(0, 0.15, n_rows), 0, 1)
+    })
+
+
+@pytest.fixture(scope='session')
+def training_csv(tmp_path_factory):
+    """Training data written where ClinicRiskModel.train_model can read it"""
+    path = tmp_path_factory.mktemp('data') / 'behavior_metrics.csv'
+    make_training_frame().to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope='session')
+def trained_model_path(training_csv, tmp_path_factory):
+    """Train once per session and save the model (and its ONNX export)"""
+    model = ClinicRiskModel()
+    model.training_data_path = str(training_csv)
+    assert model.train_model()
+
+    path = tmp_path_factory.mktemp('model') / 'clinic_risk_model.joblib'
+    assert model.save_model(str(path))
+    return path
+
+
+@pytest.fixture
+def feature_matrices(monkeypatch):
+    """Record every feature matrix a model hands to its classifier"""
+    def record(model):
+        matrices = []
+
+        def score_feature_matrix(X_matrix, rows):
+            matrices.append(X_matrix.copy())
+            return ClinicRiskModel._score_feature_matrix(model, X_matrix, rows)
+
+        monkeypatch.setattr(model, '_score_feature_matrix', score_feature_matrix)
+        return matrices
+    return record
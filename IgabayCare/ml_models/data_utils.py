@@ -0,0 +1,10 @@
+"""
+Helpers shared by the training scripts' synthetic data generators
+"""
+
+import numpy as np
+from functools import reduce
+
+def concat_str(*parts):
+    """Element-wise concatenation of strings and numpy string arrays"""
+    return reduce(np.char.add, parts)
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for the Clinic Risk Assessment API
+Risk predictions are CPU-bound, so we use pre-forked sync workers
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2))
+worker_class = 'sync'
+# Threads per worker; raise together with RISK_BATCHING=true so requests can be batched
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Load the model once in the master so workers share it copy-on-write
+preload_app = True
+
+def pre_fork(server, worker):
+    """Freeze the preloaded objects so the GC doesn't dirty their shared pages"""
+    # The cyclic GC writes to every tracked object's header; moving the loaded
+    # model into the permanent generation keeps those pages shared after fork
+    gc.freeze()
@@ -3,15 +3,46 @@ Test API for your trained ML model
 """
 
 import joblib
-import pandas as pd
 import numpy as np
+import warnings
+from functools import lru_cache
+
+MODEL_PATH = 'clinic_risk_model.joblib'
+
+# The model was fitted on a DataFrame; predictions pass arrays in the same column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+@lru_cache(maxsize=1)
+def load_model_data(path=MODEL_PATH):
+    """Load the trained model bundle once and reuse it on later calls"""
+    return joblib.load(path)
+
+def build_features(data):
+    """Build the model's feature dict for one clinic"""
+    return {
+        'has_website': 1 if data.get('website') else 0,
+        'has_phone': 1 if data.get('phone') else 0,
+        'has_license': 1 if data.get('license_number') else 0,
+        'has_accreditation': 1 if data.get('accreditation') else 0,
+        'years_in_business': 2024 - data.get('year_established', 2024),
+        'number_of_doctors': data.get('number_of_doctors', 1),
+        'number_of_staff': data.get('number_of_staff', 0),
+        'mouseMoveCount': data.get('mouseMoveCount', 0),
+        'keyPressCount': data.get('keyPressCount', 0),
+        'timeOnPageSeconds': data.get('timeOnPageSeconds', 0),
+        'mouseMoveRate': data.get('mouseMoveRate', 0),
+        'keyPressRate': data.get('keyPressRate', 0),
+        'interactionBalance': data.get('interactionBalance', 0),
+        'interactionScore': data.get('interactionScore', 0),
+        'idleRatio': data.get('idleRatio', 0)
+    }
 
 def test_model():
     print("=== Testing Your Trained ML Model ===")
     
     # Load the trained model
     try:
-        model_data = joblib.load('clinic_risk_model.joblib')
+        model_data = load_model_data()
         model = model_data['model']
         label_encoder = model_data['label_encoder']
         feature_columns = model_data['feature_columns']
@@ -66,47 +97,24 @@ def test_model():
         }
     ]
     
+    # Score every test case in one predict call instead of one per case, on a
+    # matrix already in training column order (missing features default to 0)
+    features_list = [build_features(test_case['data']) for test_case in test_cases]
+    X = np.array([
+        [features.get(col, 0) for col in feature_columns]
+        for features in features_list
+    ], dtype=np.float32)
+    
+    predictions_encoded = model.predict(X)
+    predictions_proba = model.predict_proba(X)
+    risk_levels = label_encoder.inverse_transform(predictions_encoded)
+    
     print("\n=== Test Results ===")
     
-    for test_case in test_cases:
+    for test_case, risk_level, prediction_proba in zip(test_cases, risk_levels, predictions_proba):
         print(f"\nTesting: {test_case['name']}")
         print("-" * 40)
         
-        # Create features
-        features = {
-            'has_website': 1 if test_case['data'].get('website') else 0,
-            'has_phone': 1 if test_case['data'].get('phone') else 0,
-            'has_license': 1 if test_case['data'].get('license_number') else 0,
-            'has_accreditation': 1 if test_case['data'].get('accreditation') else 0,
-            'years_in_business': 2024 - test_case['data'].get('year_established', 2024),
-            'number_of_doctors': test_case['data'].get('number_of_doctors', 1),
-            'number_of_staff': test_case['data'].get('number_of_staff', 0),
-            'mouseMoveCount': test_case['data'].get('mouseMoveCount', 0),
-            'keyPressCount': test_case['data'].get('keyPressCount', 0),
-            'timeOnPageSeconds': test_case['data'].get('timeOnPageSeconds', 0),
-            'mouseMoveRate': test_case['data'].get('mouseMoveRate', 0),
-            'keyPressRate': test_case['data'].get('keyPressRate', 0),
-            'interactionBalance': test_case['data'].get('interactionBalance', 0),
-            'interactionScore': test_case['data'].get('interactionScore', 0),
-            'idleRatio': test_case['data'].get('idleRatio', 0)
-        }
-        
-        # Create DataFrame
-        df = pd.DataFrame([features])
-        
-        # Ensure all expected columns are present
-        for col in feature_columns:
-            if col not in df.columns:
-                df[col] = 0
-        
-        # Reorder columns
-        df = df[feature_columns]
-        
-        # Make prediction
-        prediction_encoded = model.predict(df)[0]
-        prediction_proba = model.predict_proba(df)[0]
-        
-        risk_level = label_encoder.inverse_transform([prediction_encoded])[0]
         confidence = np.max(prediction_proba)
         
         print(f"Risk Level: {risk_level}")
@@ -0,0 +1,70 @@
+"""
+Tests for the risk assessment API endpoints
+"""
+
+import pytest
+
+import api_integration
+
+
+@pytest.fixture
+def client(trained_model_path, monkeypatch):
+    """Flask test client serving the model trained for this session"""
+    monkeypatch.setenv('MODEL_PATH', str(trained_model_path))
+    assert api_integration.load_model()
+    return api_integration.app.test_client()
+
+
+VALID_CLINIC = {
+    'clinic_name': 'Valid Clinic',
+    'email': 'admin@healthclinic.com',
+    'website': 'https://validclinic.com',
+    'year_established': 2015,
+    'license_number': 'ABC12345'
+}
+
+
+def test_batch_assess_scores_valid_clinics_around_a_malformed_one(client):
+    clinics = [
+        VALID_CLINIC,
+        {'clinic_name': 'No Email Clinic'},
+        dict(VALID_CLINIC, clinic_name='Bad Year Clinic', year_established='abc'),
+        dict(VALID_CLINIC, clinic_name='Second Valid Clinic', year_established=2023)
+    ]
+
+    response = client.post('/batch-assess', json={'clinics': clinics})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+
+    assert [result['batch_index'] for result in data['results']] == [0, 3]
+    assert {error['batch_index']: error['error'] for error in data['errors']} == {
+        1: 'Missing required fields',
+        2: 'Prediction failed'
+    }
+
+    # Clinics scored on the fallback path match scoring them on their own
+    single = client.post('/assess-risk', json=VALID_CLINIC).get_json()['data']
+    assert data['results'][0]['risk_score'] == pytest.approx(single['risk_score'])
+    assert data['results'][0]['risk_level'] == single['risk_level']
+
+
+def test_risk_cache_key_ignores_fields_the_model_does_not_read(client):
+    key = api_integration.risk_cache_key(VALID_CLINIC)
+
+    assert key.startswith(f"risk:{api_integration.model.model_version}:")
+    assert api_integration.risk_cache_key(dict(VALID_CLINIC, request_note='retry')) == key
+    assert api_integration.risk_cache_key(dict(VALID_CLINIC, year_established=2016)) != key
+
+
+def test_cache_hit_refreshes_prediction_timestamp(client, monkeypatch):
+    cache = {}
+    monkeypatch.setattr(api_integration, 'cache_get', cache.get)
+    monkeypatch.setattr(api_integration, 'cache_set', lambda key, value, ttl=None: cache.__setitem__(key, dict(value)))
+
+    first = client.post('/assess-risk', json=VALID_CLINIC).get_json()['data']
+    cached = next(iter(cache.values()))
+    cached['prediction_timestamp'] = '2000-01-01T00:00:00'
+
+    second = client.post('/assess-risk', json=VALID_CLINIC).get_json()['data']
+    assert second['risk_score'] == first['risk_score']
+    assert second['prediction_timestamp'] > first['prediction_timestamp']
@@ -0,0 +1,50 @@
+"""
+Tests for dynamic request batching
+"""
+
+import numpy as np
+import pytest
+
+from batch_scorer import BatchScorer, _PendingPrediction
+from clinic_risk_model import ClinicRiskModel
+
+CLINIC = {'clinic_name': 'Same Clinic', 'email': 'same@gmail.com', 'phone': '+15550001234'}
+
+NEIGHBOURS = [
+    [],
+    [{'clinic_name': 'A', 'email': 'a@health.com', 'year_established': 2024, 'number_of_doctors': 1}],
+    [{'clinic_name': 'B', 'email': 'b@health.com', 'website': 'https://b.com', 'license_number': 'LIC000123'},
+     {'clinic_name': 'C', 'email': 'c@health.com', 'submission_timestamp': '2024-03-02T23:15:00'}],
+    [{'clinic_name': 'D', 'email': 'd@health.com', 'year_established': 'abc'}]
+]
+
+
+@pytest.fixture
+def scorer(trained_model_path):
+    model = ClinicRiskModel()
+    assert model.load_model(str(trained_model_path))
+    return BatchScorer(model)
+
+
+def score_in_batch(scorer, clinic, neighbours):
+    """Score clinic in one batch with neighbours and return its result"""
+    batch = [_PendingPrediction(data) for data in neighbours + [clinic]]
+    scorer._score(batch)
+    return batch[-1].result
+
+
+@pytest.mark.parametrize('neighbours', NEIGHBOURS)
+def test_score_does_not_depend_on_batch_neighbours(scorer, neighbours, feature_matrices):
+    matrices = feature_matrices(scorer.model)
+    alone = scorer.model.predict_risk(CLINIC)
+    result = score_in_batch(scorer, CLINIC, neighbours)
+
+    # The clinic is last in its batch, and last again if the batch falls back to one at a time
+    np.testing.assert_array_equal(matrices[-1][-1], matrices[0][0])
+    assert result['risk_score'] == alone['risk_score']
+    assert result['risk_level'] == alone['risk_level']
+    assert result['risk_flags'] == alone['risk_flags']
+
+
+def test_predict_waits_for_the_worker(scorer):
+    assert scorer.predict(CLINIC)['risk_score'] == scorer.model.predict_risk(CLINIC)['risk_score']
@@ -0,0 +1,132 @@
+"""
+Tests for ClinicRiskModel inference
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clinic_risk_model import ClinicRiskModel, NUMERIC_COLUMNS, SERVICE_COLUMNS, TEXT_COLUMNS
+
+# Forests run on float32 features in both paths; what's left is float32 summation
+# of the per-tree probabilities in onnxruntime
+ONNX_RISK_SCORE_TOLERANCE = 1e-6
+
+
+TEXT_VALUES = [None, '', 'Medical Center 7', 'clinic@healthcare.com', 'owner@gmail.com', 'LIC000123',
+               '+15550001234', 'Professional medical care for patients and treatment.']
+NUMERIC_VALUES = [None, 0, 1, 3, 12, 2024, 1998, 400.5]
+SERVICE_VALUES = [None, '', '[]', '["cardiology", "pediatrics"]', ['dental']]
+
+
+def random_clinic(rng):
+    """Clinic payload with a random subset of keys and values"""
+    clinic = {}
+    for columns, values in ((TEXT_COLUMNS, TEXT_VALUES), (NUMERIC_COLUMNS, NUMERIC_VALUES),
+                            (SERVICE_COLUMNS, SERVICE_VALUES)):
+        for col in columns:
+            if rng.random() < 0.5:
+                clinic[col] = values[rng.integers(len(values))]
+    if rng.random() < 0.2:
+        clinic['latitude'], clinic['longitude'] = 14.6, 121.0
+    if rng.random() < 0.2:
+        # Not supported by the scalar fast path, so these clinics go through pandas
+        clinic['submission_timestamp'] = '2024-03-02T23:15:00'
+    return clinic
+
+
+@pytest.fixture
+def model(trained_model_path):
+    model = ClinicRiskModel()
+    assert model.load_model(str(trained_model_path))
+    return model
+
+
+def test_onnx_matches_scikit_learn_on_training_sample(model, training_csv):
+    if model._onnx_session is None:
+        pytest.skip("no ONNX export (skl2onnx/onnxruntime missing or classifier not convertible)")
+
+    sample = model._read_training_file(str(training_csv))
+    onnx_results = model.predict_risk_batch(sample)
+    model._onnx_session = None
+    sklearn_results = model.predict_risk_batch(sample)
+
+    np.testing.assert_allclose(
+        [result['risk_score'] for result in onnx_results],
+        [result['risk_score'] for result in sklearn_results],
+        rtol=0, atol=ONNX_RISK_SCORE_TOLERANCE
+    )
+    assert [result['risk_level'] for result in onnx_results] == [result['risk_level'] for result in sklearn_results]
+
+
+def test_text_quality_scores_non_string_descriptions_as_zero():
+    texts = pd.Series(['Professional medical care for patients.', 12345, None, ''], dtype=object)
+
+    scores = ClinicRiskModel()._calculate_text_quality(texts)
+
+    assert scores[0] > 0
+    assert list(scores[1:]) == [0.0, 0.0, 0.0]
+
+
+def test_batch_scores_each_clinic_independently_of_its_neighbours(model, feature_matrices):
+    a = {'clinic_name': 'A', 'email': 'a@health.com', 'year_established': 2024, 'number_of_doctors': 1}
+    b = {'clinic_name': 'B', 'email': 'b@health.com'}
+    rng = np.random.default_rng(0)
+    matrices = feature_matrices(model)
+
+    for clinics in [[a, b]] + [[random_clinic(rng) for _ in range(4)] for _ in range(100)]:
+        model.predict_risk_batch(clinics)
+        batched = matrices.pop()
+        for clinic in clinics:
+            model.predict_risk(clinic)
+        np.testing.assert_array_equal(batched, np.vstack(matrices))
+        matrices.clear()
+
+
+def test_parquet_blank_text_fields_read_as_missing(tmp_path):
+    path = tmp_path / 'training.parquet'
+    pd.DataFrame({
+        'website': ['https://clinic.com', '', None],
+        'license_number': ['LIC000123', None, ''],
+        'zip_code': ['00123', '', '04000'],
+        'city': ['Manila', 'Cebu', ''],
+        'year_established': [1998, 2020, None]
+    }).to_parquet(path, index=False)
+
+    df = ClinicRiskModel()._read_training_file(str(path))
+
+    assert df['website'].isna().tolist() == [False, True, True]
+    assert df['license_number'].isna().tolist() == [False, True, True]
+    assert df['zip_code'].tolist()[::2] == ['00123', '04000']
+    assert df['city'].isna().tolist() == [False, False, True]
+
+    features = ClinicRiskModel().engineer_features(df)
+    assert features['has_website'].tolist() == [1, 0, 0]
+    assert features['license_length'].tolist() == [9, 0, 0]
+
+
+def test_fast_path_features_match_engineer_features(model):
+    rng = np.random.default_rng(1)
+    compared = 0
+
+    for _ in range(1200):
+        clinic = random_clinic(rng)
+        features = model._engineer_clinic_features(clinic)
+        if features is None:
+            continue
+
+        # Every engineered feature, including ones this model wasn't trained on
+        expected = model.engineer_features(pd.DataFrame([clinic])).iloc[0].drop('email_domain_type', errors='ignore')
+        actual = pd.Series(features).drop('email_domain_type', errors='ignore')
+        assert sorted(actual.index) == sorted(expected.index), repr(clinic)
+        np.testing.assert_allclose(actual[expected.index].astype(float), expected.astype(float),
+                                   rtol=1e-6, err_msg=repr(clinic))
+
+        # And the encoded row the classifier sees
+        fast = np.zeros(model._n_features)
+        model._fill_feature_row(fast, features)
+        np.testing.assert_allclose(fast, model._frame_feature_matrix(pd.DataFrame([clinic]))[0],
+                                   rtol=1e-6, err_msg=repr(clinic))
+        compared += 1
+
+    assert compared > 600
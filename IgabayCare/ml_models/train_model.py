@@ -1,15 +1,16 @@
 """
 Training script for clinic risk assessment model
-Usage: python train_model.py [--data-path path/to/behavior_metrics.csv]
+Usage: python train_model.py [--data-path path/to/behavior_metrics.csv] [--plot]
+       python train_model.py --sweep a.csv b.csv [--seeds 1 2 3]
 """
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from clinic_risk_model import ClinicRiskModel
 import argparse
 import os
+from data_utils import concat_str
+from joblib import Parallel, delayed
 
 def create_sample_behavioral_data():
     """Create sample behavioral metrics data for demonstration"""
@@ -18,24 +19,34 @@ def create_sample_behavioral_data():
     np.random.seed(42)
     n_samples = 1000
     
+    # Build string columns with vectorized numpy string ops; random masks are
+    # drawn in the same order as before so the seeded data doesn't change
+    idx = np.arange(n_samples).astype(str)
+    idx4 = np.char.zfill(idx, 4)
+    website_mask = np.random.random(n_samples) > 0.3
+    phone_suffix = np.random.randint(1000, 9999, n_samples).astype(str)
+    license_mask = np.random.random(n_samples) > 0.2
+    accreditation_mask = np.random.random(n_samples) > 0.4
+    tax_id_mask = np.random.random(n_samples) > 0.3
+    
     data = {
-        'clinic_id': [f'clinic_{i:04d}' for i in range(n_samples)],
-        'submission_timestamp': pd.date_range('2023-01-01', periods=n_samples, freq='H'),
-        'clinic_name': [f'Clinic {i}' for i in range(n_samples)],
-        'website': [f'https://clinic{i}.com' if np.random.random() > 0.3 else '' for i in range(n_samples)],
-        'phone': [f'+1-555-{i:04d}-{np.random.randint(1000, 9999)}' for i in range(n_samples)],
-        'email': [f'clinic{i}@example.com' for i in range(n_samples)],
-        'license_number': [f'LIC-{i:06d}' if np.random.random() > 0.2 else '' for i in range(n_samples)],
-        'accreditation': [f'ACC-{i}' if np.random.random() > 0.4 else '' for i in range(n_samples)],
-        'tax_id': [f'{i:09d}' if np.random.random() > 0.3 else '' for i in range(n_samples)],
+        'clinic_id': concat_str('clinic_', idx4),
+        'submission_timestamp': pd.date_range('2023-01-01', periods=n_samples, freq=pd.Timedelta(hours=1)),
+        'clinic_name': concat_str('Clinic ', idx),
+        'website': np.where(website_mask, concat_str('https://clinic', idx, '.com'), ''),
+        'phone': concat_str('+1-555-', idx4, '-', phone_suffix),
+        'email': concat_str('clinic', idx, '@example.com'),
+        'license_number': np.where(license_mask, concat_str('LIC-', np.char.zfill(idx, 6)), ''),
+        'accreditation': np.where(accreditation_mask, concat_str('ACC-', idx), ''),
+        'tax_id': np.where(tax_id_mask, np.char.zfill(idx, 9), ''),
         'year_established': np.random.randint(1990, 2024, n_samples),
         'number_of_doctors': np.random.randint(1, 20, n_samples),
         'number_of_staff': np.random.randint(0, 50, n_samples),
-        'address': [f'{i} Main St' for i in range(n_samples)],
-        'city': [f'City {i % 100}' for i in range(n_samples)],
-        'state': [f'State {i % 50}' for i in range(n_samples)],
-        'zip_code': [f'{i:05d}' for i in range(n_samples)],
-        'description': [f'Medical clinic {i} providing healthcare services.' for i in range(n_samples)],
+        'address': concat_str(idx, ' Main St'),
+        'city': pd.Categorical(concat_str('City ', (np.arange(n_samples) % 100).astype(str))),
+        'state': pd.Categorical(concat_str('State ', (np.arange(n_samples) % 50).astype(str))),
+        'zip_code': np.char.zfill(idx, 5),
+        'description': concat_str('Medical clinic ', idx, ' providing healthcare services.'),
         'latitude': np.random.uniform(10, 20, n_samples),
         'longitude': np.random.uniform(120, 125, n_samples),
         
@@ -59,29 +70,26 @@ def create_sample_behavioral_data():
     df = pd.DataFrame(data)
     
     # Create risk level labels
-    df['risk_level'] = df['risk_score'].apply(
-        lambda x: 'LOW' if x <= 0.3 else ('MEDIUM' if x <= 0.7 else 'HIGH')
+    df['risk_level'] = pd.cut(
+        df['risk_score'], bins=[-0.01, 0.3, 0.7, 1.01], labels=['LOW', 'MEDIUM', 'HIGH']
     )
     
     # Add some realistic correlations
     # Higher risk clinics tend to have missing information
-    mask_high_risk = df['risk_level'] == 'HIGH'
-    df.loc[mask_high_risk, 'license_number'] = df.loc[mask_high_risk, 'license_number'].apply(
-        lambda x: x if np.random.random() > 0.6 else ''
-    )
-    df.loc[mask_high_risk, 'accreditation'] = df.loc[mask_high_risk, 'accreditation'].apply(
-        lambda x: x if np.random.random() > 0.7 else ''
-    )
+    # Only the dropped rows are written; kept values are never read back
+    high_risk_idx = df.index[(df['risk_level'] == 'HIGH').to_numpy()]
+    df.loc[high_risk_idx[np.random.random(len(high_risk_idx)) <= 0.6], 'license_number'] = ''
+    df.loc[high_risk_idx[np.random.random(len(high_risk_idx)) <= 0.7], 'accreditation'] = ''
     
     # Lower risk clinics tend to be established
-    mask_low_risk = df['risk_level'] == 'LOW'
-    df.loc[mask_low_risk, 'year_established'] = df.loc[mask_low_risk, 'year_established'].apply(
-        lambda x: max(x, np.random.randint(2000, 2015))
+    mask_low_risk = (df['risk_level'] == 'LOW').to_numpy()
+    df.loc[mask_low_risk, 'year_established'] = np.maximum(
+        df.loc[mask_low_risk, 'year_established'], np.random.randint(2000, 2015, mask_low_risk.sum())
     )
     
     return df
 
-def analyze_data(df):
+def analyze_data(df, plot=False):
     """Perform exploratory data analysis"""
     print("\n📊 Data Analysis")
     print("=" * 50)
@@ -90,6 +98,16 @@ def analyze_data(df):
     print(f"Risk level distribution:")
     print(df['risk_level'].value_counts())
     
+    if plot:
+        plot_data(df)
+
+def plot_data(df):
+    """Save distribution and correlation plots to ml_models/"""
+    # Imported here so training runs never pay for matplotlib; Agg avoids GUI backends
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
     # Create visualizations
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     
@@ -119,30 +137,67 @@ def analyze_data(df):
     
     plt.tight_layout()
     plt.savefig('ml_models/data_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.close(fig)
     
     # Correlation matrix
     numeric_cols = df.select_dtypes(include=[np.number]).columns
-    correlation_matrix = df[numeric_cols].corr()
+    correlation_matrix = df[numeric_cols].astype(np.float32).corr()
     
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(correlation_matrix, annot=False, cmap='coolwarm', center=0)
-    plt.title('Feature Correlation Matrix')
+    fig, ax = plt.subplots(figsize=(12, 8))
+    image = ax.imshow(correlation_matrix.values, cmap='coolwarm', vmin=-1, vmax=1)
+    fig.colorbar(image, ax=ax)
+    ax.set_xticks(range(len(numeric_cols)))
+    ax.set_xticklabels(numeric_cols, rotation=90)
+    ax.set_yticks(range(len(numeric_cols)))
+    ax.set_yticklabels(numeric_cols)
+    ax.set_title('Feature Correlation Matrix')
     plt.tight_layout()
     plt.savefig('ml_models/correlation_matrix.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.close(fig)
+
+def train_and_save(data_path, random_state=42, test_size=0.2):
+    """Train one model on a CSV and save it under a name unique to the run"""
+    risk_model = ClinicRiskModel()
+    risk_model.training_data_path = data_path
+    if not risk_model.train_model(test_size=test_size, random_state=random_state):
+        return None
+    
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    model_path = f'ml_models/clinic_risk_model_{stem}_{random_state}.joblib'
+    return model_path if risk_model.save_model(model_path) else None
+
+def run_sweep(data_paths, seeds, test_size=0.2):
+    """Train every data path/seed combination in parallel worker processes"""
+    configs = [(path, seed) for path in data_paths for seed in seeds]
+    print(f"\n🚀 Training {len(configs)} models in parallel...")
+    model_paths = Parallel(n_jobs=-1, backend='loky')(
+        delayed(train_and_save)(path, seed, test_size) for path, seed in configs
+    )
+    
+    print("\n📋 Sweep results:")
+    for (path, seed), model_path in zip(configs, model_paths):
+        status = f"✅ {model_path}" if model_path else "❌ training failed"
+        print(f"  {path} (seed {seed}): {status}")
 
 def main():
     parser = argparse.ArgumentParser(description='Train clinic risk assessment model')
     parser.add_argument('--data-path', type=str, help='Path to behavioral metrics CSV file')
     parser.add_argument('--create-sample', action='store_true', help='Create sample data for training')
     parser.add_argument('--analyze-only', action='store_true', help='Only analyze data, don\'t train')
+    parser.add_argument('--plot', action='store_true', help='Save data analysis plots to ml_models/')
+    parser.add_argument('--sweep', type=str, nargs='+', metavar='DATA_PATH',
+                        help='Train one model per data path and seed in parallel')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[42], help='Random seeds for --sweep')
     
     args = parser.parse_args()
     
     # Create ml_models directory if it doesn't exist
     os.makedirs('ml_models', exist_ok=True)
     
+    if args.sweep:
+        run_sweep(args.sweep, args.seeds)
+        return
+    
     # Load or create data
     if args.create_sample or not args.data_path:
         print("📝 Creating sample behavioral data...")
@@ -157,13 +212,14 @@ def main():
     
     elif args.data_path:
         print(f"📂 Loading data from {args.data_path}")
-        df = pd.read_csv(args.data_path)
+        df = pd.read_parquet(args.data_path) if args.data_path.endswith('.parquet') else pd.read_csv(args.data_path)
     else:
         print("❌ No data path provided. Use --data-path or --create-sample")
         return
     
-    # Analyze data
-    analyze_data(df)
+    # Analyze data only when asked; plain training runs go straight to the model
+    if args.analyze_only or args.plot:
+        analyze_data(df, plot=args.plot)
     
     if args.analyze_only:
         print("📊 Analysis complete. Skipping training.")
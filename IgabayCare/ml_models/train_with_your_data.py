@@ -4,17 +4,21 @@ Training script specifically for your behavioral metrics data
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from clinic_risk_model import ClinicRiskModel
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 import os
+from data_utils import concat_str
 
 def load_and_prepare_your_data():
     """Load and prepare your specific behavioral metrics data"""
     print("Loading your behavioral metrics data...")
     
     # Load your behavioral data
-    behavior_df = pd.read_csv('data/behavior_metrics.csv')
+    # Multithreaded pyarrow parse; captureTimestamp stays text rather than being inferred as a timestamp
+    behavior_df = pa_csv.read_csv(
+        'data/behavior_metrics.csv',
+        convert_options=pa_csv.ConvertOptions(column_types={'captureTimestamp': pa.string()})
+    ).to_pandas()
     print(f"Loaded {len(behavior_df)} behavioral records")
     
     # Since you have behavioral data but no clinic data, 
@@ -25,23 +29,33 @@ def load_and_prepare_your_data():
     np.random.seed(42)
     n_records = len(behavior_df)
     
+    # Build string columns with vectorized numpy string ops; random masks are
+    # drawn in the same order as before so the seeded data doesn't change
+    idx = np.arange(n_records).astype(str)
+    idx4 = np.char.zfill(idx, 4)
+    website_mask = np.random.random(n_records) > 0.3
+    phone_suffix = np.random.randint(1000, 9999, n_records).astype(str)
+    license_mask = np.random.random(n_records) > 0.2
+    accreditation_mask = np.random.random(n_records) > 0.4
+    tax_id_mask = np.random.random(n_records) > 0.3
+    
     clinic_data = {
-        'clinic_id': [f'clinic_{i:04d}' for i in range(n_records)],
-        'clinic_name': [f'Medical Center {i}' for i in range(n_records)],
-        'website': [f'https://clinic{i}.com' if np.random.random() > 0.3 else '' for i in range(n_records)],
-        'phone': [f'+1-555-{i:04d}-{np.random.randint(1000, 9999)}' for i in range(n_records)],
-        'email': [f'clinic{i}@healthcare.com' for i in range(n_records)],
-        'license_number': [f'LIC-{i:06d}' if np.random.random() > 0.2 else '' for i in range(n_records)],
-        'accreditation': [f'ACC-{i}' if np.random.random() > 0.4 else '' for i in range(n_records)],
-        'tax_id': [f'{i:09d}' if np.random.random() > 0.3 else '' for i in range(n_records)],
+        'clinic_id': concat_str('clinic_', idx4),
+        'clinic_name': concat_str('Medical Center ', idx),
+        'website': np.where(website_mask, concat_str('https://clinic', idx, '.com'), ''),
+        'phone': concat_str('+1-555-', idx4, '-', phone_suffix),
+        'email': concat_str('clinic', idx, '@healthcare.com'),
+        'license_number': np.where(license_mask, concat_str('LIC-', np.char.zfill(idx, 6)), ''),
+        'accreditation': np.where(accreditation_mask, concat_str('ACC-', idx), ''),
+        'tax_id': np.where(tax_id_mask, np.char.zfill(idx, 9), ''),
         'year_established': np.random.randint(1990, 2024, n_records),
         'number_of_doctors': np.random.randint(1, 15, n_records),
         'number_of_staff': np.random.randint(0, 30, n_records),
-        'address': [f'{i} Healthcare Ave' for i in range(n_records)],
-        'city': [f'Medical City {i % 50}' for i in range(n_records)],
-        'state': [f'Health State {i % 25}' for i in range(n_records)],
-        'zip_code': [f'{i:05d}' for i in range(n_records)],
-        'description': [f'Comprehensive medical facility {i} providing quality healthcare services.' for i in range(n_records)],
+        'address': concat_str(idx, ' Healthcare Ave'),
+        'city': concat_str('Medical City ', (np.arange(n_records) % 50).astype(str)),
+        'state': concat_str('Health State ', (np.arange(n_records) % 25).astype(str)),
+        'zip_code': np.char.zfill(idx, 5),
+        'description': concat_str('Comprehensive medical facility ', idx, ' providing quality healthcare services.'),
         'latitude': np.random.uniform(10, 20, n_records),
         'longitude': np.random.uniform(120, 125, n_records),
         
@@ -59,79 +73,92 @@ def load_and_prepare_your_data():
         'behavioral_label': behavior_df['label'].values
     }
     
-    # Create risk labels based on behavioral patterns
-    clinic_df = pd.DataFrame(clinic_data)
-    
     # Analyze behavioral patterns to create risk scores
     print("🧠 Analyzing behavioral patterns for risk assessment...")
     
-    risk_scores = []
-    for i, row in clinic_df.iterrows():
-        score = 0.5  # Base score
-        
-        # Behavioral risk factors
-        if row['idleRatio'] > 0.5:  # High idle time
-            score += 0.1
-        if row['interactionScore'] < 0.3:  # Low interaction
-            score += 0.15
-        if row['mouseMoveRate'] < 0.5:  # Low mouse activity
-            score += 0.1
-        if row['keyPressRate'] < 0.5:  # Low keyboard activity
-            score += 0.1
-        
-        # Behavioral protective factors
-        if row['interactionScore'] > 0.7:  # High interaction
-            score -= 0.15
-        if row['timeOnPageSeconds'] > 120:  # Good time spent
-            score -= 0.1
-        if row['interactionBalance'] > 0.6:  # Balanced interaction
-            score -= 0.1
-        
-        # Business legitimacy factors
-        if not row['license_number']:
-            score += 0.2
-        if not row['accreditation']:
-            score += 0.1
-        if not row['website']:
-            score += 0.1
-        
-        # Business maturity factors
-        if row['year_established'] > 2018:  # New business
-            score += 0.15
-        elif row['year_established'] < 2010:  # Established
-            score -= 0.1
-        
-        risk_scores.append(max(0.0, min(1.0, score)))
+    # Score straight from the source arrays; the masks already say which clinics
+    # got a license, accreditation or website, so no string comparisons are needed
+    idle_ratio = clinic_data['idleRatio']
+    interaction_score = clinic_data['interactionScore']
+    year_established = clinic_data['year_established']
+    
+    score = np.full(n_records, 0.5)  # Base score
     
-    clinic_df['risk_score'] = risk_scores
+    # Behavioral risk factors
+    score += 0.1 * (idle_ratio > 0.5)  # High idle time
+    score += 0.15 * (interaction_score < 0.3)  # Low interaction
+    score += 0.1 * (clinic_data['mouseMoveRate'] < 0.5)  # Low mouse activity
+    score += 0.1 * (clinic_data['keyPressRate'] < 0.5)  # Low keyboard activity
+    
+    # Behavioral protective factors
+    score -= 0.15 * (interaction_score > 0.7)  # High interaction
+    score -= 0.1 * (clinic_data['timeOnPageSeconds'] > 120)  # Good time spent
+    score -= 0.1 * (clinic_data['interactionBalance'] > 0.6)  # Balanced interaction
+    
+    # Business legitimacy factors
+    score += 0.2 * ~license_mask
+    score += 0.1 * ~accreditation_mask
+    score += 0.1 * ~website_mask
+    
+    # Business maturity factors
+    score += 0.15 * (year_established > 2018)  # New business
+    score -= 0.1 * (year_established < 2010)  # Established
+    
+    np.clip(score, 0.0, 1.0, out=score)
+    clinic_data['risk_score'] = score
     
     # Create risk levels
-    clinic_df['risk_level'] = clinic_df['risk_score'].apply(
-        lambda x: 'LOW' if x <= 0.3 else ('MEDIUM' if x <= 0.7 else 'HIGH')
+    clinic_data['risk_level'] = pd.cut(
+        score, bins=[-0.01, 0.3, 0.7, 1.01], labels=['LOW', 'MEDIUM', 'HIGH']
     )
     
+    # Build the frame once, risk columns included, instead of appending to it
+    clinic_df = pd.DataFrame(clinic_data)
+    
     print(f"📊 Risk distribution:")
     print(clinic_df['risk_level'].value_counts())
     
     return clinic_df
 
-def analyze_behavioral_patterns(df):
+def analyze_behavioral_patterns(df, plot=False):
     """Analyze behavioral patterns in your data"""
     print("\n📈 Behavioral Pattern Analysis")
     print("=" * 50)
     
+    if plot:
+        plot_behavioral_patterns(df)
+    
+    # Print insights
+    print("\n🔍 Key Insights:")
+    print(f"• Average interaction score: {df['interactionScore'].mean():.3f}")
+    print(f"• Average idle ratio: {df['idleRatio'].mean():.3f}")
+    print(f"• Average time on page: {df['timeOnPageSeconds'].mean():.1f} seconds")
+    print(f"• High risk clinics: {len(df[df['risk_level'] == 'HIGH'])} ({len(df[df['risk_level'] == 'HIGH'])/len(df)*100:.1f}%)")
+    print(f"• Medium risk clinics: {len(df[df['risk_level'] == 'MEDIUM'])} ({len(df[df['risk_level'] == 'MEDIUM'])/len(df)*100:.1f}%)")
+    print(f"• Low risk clinics: {len(df[df['risk_level'] == 'LOW'])} ({len(df[df['risk_level'] == 'LOW'])/len(df)*100:.1f}%)")
+
+def plot_behavioral_patterns(df):
+    """Save behavioral pattern plots to ml_models/behavioral_analysis.png"""
+    # Imported here so training runs never pay for matplotlib; Agg avoids GUI backends
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    # Per-point colored scatters get slow on large data, so plot a sample
+    scatter_df = df.sample(min(len(df), 10000), random_state=42)
+    
     # Create visualizations
     fig, axes = plt.subplots(2, 3, figsize=(18, 12))
     
     # Mouse vs Keyboard activity
-    axes[0, 0].scatter(df['mouseMoveRate'], df['keyPressRate'], alpha=0.6, c=df['risk_score'], cmap='RdYlGn')
+    axes[0, 0].scatter(scatter_df['mouseMoveRate'], scatter_df['keyPressRate'], alpha=0.6, c=scatter_df['risk_score'], cmap='RdYlGn')
     axes[0, 0].set_title('Mouse vs Keyboard Activity')
     axes[0, 0].set_xlabel('Mouse Move Rate')
     axes[0, 0].set_ylabel('Key Press Rate')
     plt.colorbar(axes[0, 0].collections[0], ax=axes[0, 0], label='Risk Score')
     
     # Interaction Score vs Idle Ratio
-    axes[0, 1].scatter(df['interactionScore'], df['idleRatio'], alpha=0.6, c=df['risk_score'], cmap='RdYlGn')
+    axes[0, 1].scatter(scatter_df['interactionScore'], scatter_df['idleRatio'], alpha=0.6, c=scatter_df['risk_score'], cmap='RdYlGn')
     axes[0, 1].set_title('Interaction Score vs Idle Ratio')
     axes[0, 1].set_xlabel('Interaction Score')
     axes[0, 1].set_ylabel('Idle Ratio')
@@ -169,16 +196,7 @@ def analyze_behavioral_patterns(df):
     
     plt.tight_layout()
     plt.savefig('ml_models/behavioral_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # Print insights
-    print("\n🔍 Key Insights:")
-    print(f"• Average interaction score: {df['interactionScore'].mean():.3f}")
-    print(f"• Average idle ratio: {df['idleRatio'].mean():.3f}")
-    print(f"• Average time on page: {df['timeOnPageSeconds'].mean():.1f} seconds")
-    print(f"• High risk clinics: {len(df[df['risk_level'] == 'HIGH'])} ({len(df[df['risk_level'] == 'HIGH'])/len(df)*100:.1f}%)")
-    print(f"• Medium risk clinics: {len(df[df['risk_level'] == 'MEDIUM'])} ({len(df[df['risk_level'] == 'MEDIUM'])/len(df)*100:.1f}%)")
-    print(f"• Low risk clinics: {len(df[df['risk_level'] == 'LOW'])} ({len(df[df['risk_level'] == 'LOW'])/len(df)*100:.1f}%)")
+    plt.close(fig)
 
 def train_enhanced_model():
     """Train model with your specific data"""
@@ -188,17 +206,19 @@ def train_enhanced_model():
     # Prepare data
     df = load_and_prepare_your_data()
     
-    # Analyze patterns
-    analyze_behavioral_patterns(df)
+    # Analyze patterns; rendering plots is opt-in so headless training stays fast
+    analyze_behavioral_patterns(df, plot=bool(os.environ.get('IGABAY_PLOT')))
     
     # Save prepared data
     os.makedirs('data', exist_ok=True)
-    df.to_csv('data/combined_clinic_behavioral_data.csv', index=False)
-    print(f"💾 Saved combined data to data/combined_clinic_behavioral_data.csv")
+    # Parquet keeps dtypes and writes far faster than CSV; ClinicRiskModel reads it directly
+    df.to_parquet('data/combined_clinic_behavioral_data.parquet', engine='pyarrow', compression='zstd', index=False)
+    print(f"💾 Saved combined data to data/combined_clinic_behavioral_data.parquet")
     
-    # Initialize and train model
+    # Initialize and train model (sklearn is only loaded once there is data to train on)
+    from clinic_risk_model import ClinicRiskModel
     risk_model = ClinicRiskModel()
-    risk_model.training_data_path = 'data/combined_clinic_behavioral_data.csv'
+    risk_model.training_data_path = 'data/combined_clinic_behavioral_data.parquet'
     
     print("\n🤖 Starting Model Training...")
     if risk_model.train_model(test_size=0.2):
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for the Clinic Risk Assessment API
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker count defaults to 2 x CPU cores and can be overridden with the
+WEB_CONCURRENCY environment variable. The same config also serves the
+standalone API: gunicorn -c gunicorn.conf.py simple_api:app
+"""
+
+from api_integration import app
@@ -2,11 +2,19 @@
 """
 Behavioral Biometrics Inference Script
 Real-time prediction of human vs bot behavior
+
+One-shot: reads one JSON request from stdin and prints one result.
+With --serve: loads the model once and answers newline-delimited JSON
+requests ({"snapshot": {...}} per line) with one JSON result per line
+until stdin closes.
+Either mode also accepts {"snapshots": [...]}, scored in one model call
+and answered with {"results": [...]}.
 """
 
 import sys
 import json
 import argparse
+import operator
 import numpy as np
 import joblib
 from pathlib import Path
@@ -24,6 +32,11 @@ FEATURE_COLUMNS = [
     'idleRatio'
 ]
 
+# Pull every feature out of a snapshot in one call, with missing features as 0
+FEATURE_DEFAULTS = dict.fromkeys(FEATURE_COLUMNS, 0.0)
+get_features = operator.itemgetter(*FEATURE_COLUMNS)
+NUMERIC_TYPES = {int, float, bool}
+
 def load_model(model_path: str) -> Dict[str, Any]:
     """Load trained model and preprocessing components"""
     try:
@@ -32,94 +45,139 @@ def load_model(model_path: str) -> Dict[str, Any]:
     except Exception as e:
         raise RuntimeError(f"Failed to load model: {e}")
 
-def prepare_features(snapshot: Dict[str, Any]) -> np.ndarray:
-    """Convert snapshot to feature array"""
+def feature_value(value: Any) -> float:
+    """Snapshot value as a float, with None or invalid values as 0"""
+    if value is None or not isinstance(value, (int, float)):
+        return 0.0
+    return float(value)
+
+def prepare_features(snapshots: List[Dict[str, Any]]) -> np.ndarray:
+    """Convert snapshots to an (n_snapshots, n_features) feature array"""
     features = []
+    for snapshot in snapshots:
+        values = get_features({**FEATURE_DEFAULTS, **snapshot})
+        # Only rows holding something other than plain numbers need per-value cleanup
+        if not NUMERIC_TYPES.issuperset(map(type, values)):
+            values = [feature_value(value) for value in values]
+        features.append(values)
+    # float32 to match the dtype the model was trained on
+    return np.array(features, dtype=np.float32).reshape(len(snapshots), len(FEATURE_COLUMNS))
+
+def failed_result(reason: str) -> Dict[str, Any]:
+    """Safe bot verdict returned when a request can't be scored"""
+    return {
+        'isHuman': False,
+        'confidence': 0.0,
+        'modelVersion': 'error',
+        'reason': reason,
+        'probabilities': {
+            'human': 0.0,
+            'bot': 1.0
+        }
+    }
+
+def build_result(snapshot: Dict[str, Any], prediction: Any, probabilities: np.ndarray, version: str) -> Dict[str, Any]:
+    """Turn one row of model output into the API result for its snapshot"""
+    # Get confidence scores
+    human_prob = probabilities[1] if len(probabilities) > 1 else 0.0
+    bot_prob = probabilities[0] if len(probabilities) > 0 else 0.0
     
-    for feature in FEATURE_COLUMNS:
-        value = snapshot.get(feature, 0)
-        # Handle potential None or invalid values
-        if value is None or not isinstance(value, (int, float)):
-            value = 0
-        features.append(float(value))
+    is_human = bool(prediction == 1)
+    confidence = max(human_prob, bot_prob)
+    
+    # Determine reason for decision
+    reason = "Behavioral patterns match human interaction"
+    if not is_human:
+        # Simple heuristics for bot detection
+        time_on_page = snapshot.get('timeOnPageSeconds', 0)
+        mouse_rate = snapshot.get('mouseMoveRate', 0)
+        key_rate = snapshot.get('keyPressRate', 0)
+        idle_ratio = snapshot.get('idleRatio', 0)
+        
+        reasons = []
+        if time_on_page < 5:
+            reasons.append("very short time on page")
+        if mouse_rate < 0.1 and key_rate < 0.1:
+            reasons.append("minimal interaction")
+        if idle_ratio > 0.7:
+            reasons.append("high idle ratio")
+        
+        if reasons:
+            reason = f"Bot indicators: {', '.join(reasons)}"
     
-    return np.array(features).reshape(1, -1)
+    return {
+        'isHuman': is_human,
+        'confidence': float(confidence),
+        'modelVersion': version,
+        'reason': reason,
+        'probabilities': {
+            'human': float(human_prob),
+            'bot': float(bot_prob)
+        }
+    }
 
-def predict_human(model_data: Dict[str, Any], snapshot: Dict[str, Any]) -> Dict[str, Any]:
-    """Make prediction on behavior snapshot"""
+def predict_human_batch(model_data: Dict[str, Any], snapshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Make predictions on several behavior snapshots with one model call"""
     try:
         # Extract model components
         model = model_data['model']
         scaler = model_data['scaler']
         version = model_data.get('version', 'unknown')
         
-        # Prepare features
-        features = prepare_features(snapshot)
-        
-        # Scale features
-        features_scaled = scaler.transform(features)
-        
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
-        probabilities = model.predict_proba(features_scaled)[0]
-        
-        # Get confidence scores
-        human_prob = probabilities[1] if len(probabilities) > 1 else 0.0
-        bot_prob = probabilities[0] if len(probabilities) > 0 else 0.0
-        
-        is_human = bool(prediction == 1)
-        confidence = max(human_prob, bot_prob)
-        
-        # Determine reason for decision
-        reason = "Behavioral patterns match human interaction"
-        if not is_human:
-            # Simple heuristics for bot detection
-            time_on_page = snapshot.get('timeOnPageSeconds', 0)
-            mouse_rate = snapshot.get('mouseMoveRate', 0)
-            key_rate = snapshot.get('keyPressRate', 0)
-            idle_ratio = snapshot.get('idleRatio', 0)
-            
-            reasons = []
-            if time_on_page < 5:
-                reasons.append("very short time on page")
-            if mouse_rate < 0.1 and key_rate < 0.1:
-                reasons.append("minimal interaction")
-            if idle_ratio > 0.7:
-                reasons.append("high idle ratio")
-            
-            if reasons:
-                reason = f"Bot indicators: {', '.join(reasons)}"
-        
-        result = {
-            'isHuman': is_human,
-            'confidence': float(confidence),
-            'modelVersion': version,
-            'reason': reason,
-            'probabilities': {
-                'human': float(human_prob),
-                'bot': float(bot_prob)
-            }
-        }
-        
-        return result
+        # Scale the whole batch at once
+        features_scaled = scaler.transform(prepare_features(snapshots))
         
+        # predict() is the argmax of predict_proba(), so one call gives both
+        probabilities = model.predict_proba(features_scaled)
+        predictions = model.classes_[probabilities.argmax(axis=1)]
     except Exception as e:
         # Return safe default on error
-        return {
-            'isHuman': False,
-            'confidence': 0.0,
-            'modelVersion': 'error',
-            'reason': f'Prediction error: {str(e)}',
-            'probabilities': {
-                'human': 0.0,
-                'bot': 1.0
-            }
-        }
+        return [failed_result(f'Prediction error: {str(e)}') for _ in snapshots]
+    
+    results = []
+    for snapshot, prediction, row in zip(snapshots, predictions, probabilities):
+        try:
+            results.append(build_result(snapshot, prediction, row, version))
+        except Exception as e:
+            results.append(failed_result(f'Prediction error: {str(e)}'))
+    return results
+
+def predict_human(model_data: Dict[str, Any], snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Make prediction on behavior snapshot"""
+    return predict_human_batch(model_data, [snapshot])[0]
+
+def handle_request(model_data: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+    """Score a {"snapshot": {...}} or a batched {"snapshots": [...]} request"""
+    snapshots = request.get('snapshots')
+    if snapshots is not None:
+        return {'results': predict_human_batch(model_data, snapshots)}
+    
+    snapshot = request.get('snapshot')
+    if not snapshot:
+        raise ValueError("No snapshot provided in input")
+    return predict_human(model_data, snapshot)
+
+def serve(model_data: Dict[str, Any]) -> None:
+    """Answer newline-delimited JSON requests from stdin until it is closed"""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        
+        try:
+            result = handle_request(model_data, json.loads(line))
+        except Exception as e:
+            # A bad request must not take down the worker
+            result = failed_result(f'Inference failed: {str(e)}')
+        
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
 
 def main():
     parser = argparse.ArgumentParser(description='Behavioral biometrics inference')
     parser.add_argument('--model', type=str, default='models/behavior_model.joblib', 
                        help='Path to trained model')
+    parser.add_argument('--serve', action='store_true',
+                       help='Keep running and answer one JSON request per stdin line')
     
     args = parser.parse_args()
     
@@ -127,32 +185,18 @@ def main():
         # Load model
         model_data = load_model(args.model)
         
-        # Read input from stdin
-        input_data = json.loads(sys.stdin.read())
+        if args.serve:
+            serve(model_data)
+            return
         
-        # Extract snapshot
-        snapshot = input_data.get('snapshot')
-        if not snapshot:
-            raise ValueError("No snapshot provided in input")
-        
-        # Make prediction
-        result = predict_human(model_data, snapshot)
+        # Read input from stdin and make prediction(s)
+        result = handle_request(model_data, json.loads(sys.stdin.read()))
         
         # Output result
         print(json.dumps(result))
         
     except Exception as e:
-        error_result = {
-            'isHuman': False,
-            'confidence': 0.0,
-            'modelVersion': 'error',
-            'reason': f'Inference failed: {str(e)}',
-            'probabilities': {
-                'human': 0.0,
-                'bot': 1.0
-            }
-        }
-        print(json.dumps(error_result))
+        print(json.dumps(failed_result(f'Inference failed: {str(e)}')))
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -6,92 +6,116 @@ Provides simple rule-based classification when no trained model is available
 
 import sys
 import json
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, Any, List
 
-def predict_human_mock(snapshot: Dict[str, Any]) -> Dict[str, Any]:
-    """Simple rule-based human/bot detection"""
-    
-    # Extract features
-    time_on_page = snapshot.get('timeOnPageSeconds', 0)
-    mouse_rate = snapshot.get('mouseMoveRate', 0)
-    key_rate = snapshot.get('keyPressRate', 0)
-    idle_ratio = snapshot.get('idleRatio', 0)
-    interaction_score = snapshot.get('interactionScore', 0)
-    
-    # Simple heuristics for bot detection
-    bot_indicators = []
-    confidence = 0.5
-    
-    # Very short time on page suggests bot
-    if time_on_page < 5:
-        bot_indicators.append("very short time on page")
-        confidence += 0.3
-    
-    # Minimal interaction suggests bot
-    if mouse_rate < 0.1 and key_rate < 0.1:
-        bot_indicators.append("minimal interaction")
-        confidence += 0.2
-    
-    # High idle ratio suggests bot
-    if idle_ratio > 0.7:
-        bot_indicators.append("high idle ratio")
-        confidence += 0.2
-    
-    # Low interaction score suggests bot
-    if interaction_score < 0.1:
-        bot_indicators.append("low interaction score")
-        confidence += 0.1
-    
-    # Human indicators
-    human_indicators = []
-    
-    if time_on_page > 30 and time_on_page < 300:
-        human_indicators.append("reasonable time on page")
-        confidence -= 0.2
+# Snapshot fields the rules read, in column order of the feature matrix
+RULE_FEATURES = ['timeOnPageSeconds', 'mouseMoveRate', 'keyPressRate', 'idleRatio', 'interactionScore']
+TIME, MOUSE, KEY, IDLE, INTERACTION = range(len(RULE_FEATURES))
+
+# (description, confidence shift) per rule; positive shifts point to a bot.
+# Shifts are applied in this order so the sums match the scalar rules exactly.
+BOT_RULES = [
+    ("very short time on page", 0.3),
+    ("minimal interaction", 0.2),
+    ("high idle ratio", 0.2),
+    ("low interaction score", 0.1),
+]
+HUMAN_RULES = [
+    ("reasonable time on page", -0.2),
+    ("active interaction", -0.2),
+    ("low idle ratio", -0.1),
+]
+RULE_SHIFTS = np.array([shift for _, shift in BOT_RULES + HUMAN_RULES])
+
+def rule_value(snapshot: Dict[str, Any], feature: str) -> float:
+    """Numeric snapshot value for a rule input (missing counts as 0)"""
+    value = snapshot.get(feature, 0)
+    if not isinstance(value, (int, float)):
+        raise TypeError(f"{feature} must be a number")
+    return float(value)
+
+def rule_hits(features: np.ndarray) -> np.ndarray:
+    """Boolean (n_snapshots, n_rules) matrix of which rules fire"""
+    time_on_page = features[:, TIME]
+    mouse_rate = features[:, MOUSE]
+    key_rate = features[:, KEY]
+    idle_ratio = features[:, IDLE]
+    interaction_score = features[:, INTERACTION]
     
-    if mouse_rate > 0.5 and key_rate > 0.1:
-        human_indicators.append("active interaction")
-        confidence -= 0.2
+    return np.column_stack([
+        # Bot indicators
+        time_on_page < 5,
+        (mouse_rate < 0.1) & (key_rate < 0.1),
+        idle_ratio > 0.7,
+        interaction_score < 0.1,
+        # Human indicators
+        (time_on_page > 30) & (time_on_page < 300),
+        (mouse_rate > 0.5) & (key_rate > 0.1),
+        idle_ratio < 0.5,
+    ])
+
+def predict_human_mock_batch(snapshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Simple rule-based human/bot detection for several snapshots at once"""
+    features = np.array(
+        [[rule_value(snapshot, feature) for feature in RULE_FEATURES] for snapshot in snapshots],
+        dtype=np.float64
+    ).reshape(len(snapshots), len(RULE_FEATURES))
+    hits = rule_hits(features)
     
-    if idle_ratio < 0.5:
-        human_indicators.append("low idle ratio")
-        confidence -= 0.1
+    # Accumulate rule by rule (not as a dot product) to keep the float sums identical
+    confidence = np.full(len(snapshots), 0.5)
+    for rule, shift in enumerate(RULE_SHIFTS):
+        confidence[hits[:, rule]] += shift
     
-    # Determine final prediction
+    # Determine final predictions
     is_human = confidence < 0.6
-    final_confidence = abs(confidence - 0.5) * 2  # Scale to 0-1
-    
-    # Generate reason
-    if is_human:
-        reason = f"Human indicators: {', '.join(human_indicators) if human_indicators else 'normal behavior patterns'}"
-    else:
-        reason = f"Bot indicators: {', '.join(bot_indicators) if bot_indicators else 'suspicious behavior patterns'}"
+    final_confidence = np.abs(confidence - 0.5) * 2  # Scale to 0-1
     
-    result = {
-        'isHuman': is_human,
-        'confidence': min(1.0, max(0.0, final_confidence)),
-        'modelVersion': 'mock-1.0.0',
-        'reason': reason,
-        'probabilities': {
-            'human': 1 - final_confidence if is_human else 0.1,
-            'bot': final_confidence if not is_human else 0.1
-        }
-    }
+    results = []
+    for row_hits, human, conf in zip(hits, is_human.tolist(), final_confidence.tolist()):
+        # Generate reason
+        if human:
+            indicators = [name for (name, _), hit in zip(HUMAN_RULES, row_hits[len(BOT_RULES):]) if hit]
+            reason = f"Human indicators: {', '.join(indicators) if indicators else 'normal behavior patterns'}"
+        else:
+            indicators = [name for (name, _), hit in zip(BOT_RULES, row_hits[:len(BOT_RULES)]) if hit]
+            reason = f"Bot indicators: {', '.join(indicators) if indicators else 'suspicious behavior patterns'}"
+        
+        results.append({
+            'isHuman': human,
+            'confidence': min(1.0, max(0.0, conf)),
+            'modelVersion': 'mock-1.0.0',
+            'reason': reason,
+            'probabilities': {
+                'human': 1 - conf if human else 0.1,
+                'bot': conf if not human else 0.1
+            }
+        })
     
-    return result
+    return results
+
+def predict_human_mock(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Simple rule-based human/bot detection"""
+    return predict_human_mock_batch([snapshot])[0]
 
 def main():
     try:
         # Read input from stdin
         input_data = json.loads(sys.stdin.read())
         
-        # Extract snapshot
-        snapshot = input_data.get('snapshot')
-        if not snapshot:
-            raise ValueError("No snapshot provided in input")
-        
-        # Make prediction
-        result = predict_human_mock(snapshot)
+        # Batched requests are scored in one pass
+        snapshots = input_data.get('snapshots')
+        if snapshots is not None:
+            result = {'results': predict_human_mock_batch(snapshots)}
+        else:
+            # Extract snapshot
+            snapshot = input_data.get('snapshot')
+            if not snapshot:
+                raise ValueError("No snapshot provided in input")
+            
+            # Make prediction
+            result = predict_human_mock(snapshot)
         
         # Output result
         print(json.dumps(result))
@@ -3,49 +3,235 @@
 Quick model training script for behavioral biometrics
 """
 
+import hashlib
+import importlib.util
 import subprocess
 import sys
 import os
 
-def run_command(cmd):
-    """Run command and return result"""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+REQUIREMENTS_FILE = 'requirements.txt'
+# Optional fully pinned set (e.g. `pip freeze > requirements-frozen.txt` in a working environment);
+# when present it is installed with --no-deps, skipping pip's resolver
+REQUIREMENTS_FROZEN = 'requirements-frozen.txt'
+REQUIREMENTS_LOCK = os.path.join('.mediclinic', 'requirements.lock')
+TRAINING_SCRIPT = 'src/ml/behavior_training.py'
+DATA_CSV = 'data/behavior_metrics.csv'
+MODEL_OUT = 'models/behavior_model.joblib'
+# Hashes of the data and training script MODEL_OUT was trained from
+MODEL_HASH = MODEL_OUT + '.hash'
+SAMPLE_SIZE = 2000
+# Records the sample size DATA_CSV was generated with
+SAMPLE_META = os.path.join('.mediclinic', 'sample_data.meta')
+
+# No self-update check or prompts, wheels over source builds for the numeric packages, and no
+# up-front byte-compiling of every installed module (imports compile what they actually use)
+PIP_ARGV = (sys.executable, "-m", "pip", "install", "--disable-pip-version-check", "--no-input",
+            "--prefer-binary", "--no-compile")
+# Set for every child on top of the inherited environment (which keeps PATH, venv,
+# proxy and certificate settings): reproducible hashing and a non-interactive pip
+CHILD_ENV = {
+    'PYTHONHASHSEED': '0',
+    'PIP_NO_INPUT': '1',
+    'PIP_DISABLE_PIP_VERSION_CHECK': '1',
+}
+# behavior_training command-line equivalents of the in-process steps, used when it can't be imported
+GENERATE_ARGS = ("--generate-sample", DATA_CSV, "--sample-size", str(SAMPLE_SIZE))
+TRAIN_ARGS = ("--data", DATA_CSV, "--output", MODEL_OUT)
+
+def log(message):
+    """Print a progress message; all launcher output goes through here"""
+    # Children write straight to our stdout/stderr, so flush every message
+    # to keep it in order with theirs
+    print(message, flush=True)
+
+def run_command(argv):
+    """Run command (an argv list, executed without a shell), raising RuntimeError if it fails"""
+    # The child writes straight to our stdout/stderr, so output shows up live
+    result = subprocess.run(argv, env={**os.environ, **CHILD_ENV})
     if result.returncode != 0:
-        print(f"Error running command: {cmd}")
-        print(f"Error: {result.stderr}")
+        raise RuntimeError(f"Command failed with exit code {result.returncode}: {' '.join(argv)}")
+
+def file_sha256(path):
+    """Hex sha256 of a file's contents"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+, hashes in C without Python-level chunking
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        return hashlib.sha256(f.read()).hexdigest()
+
+def requirements_install():
+    """Requirements file to install and the pip command that installs it"""
+    if os.path.exists(REQUIREMENTS_FROZEN):
+        return REQUIREMENTS_FROZEN, PIP_ARGV + ("--no-deps", "-r", REQUIREMENTS_FROZEN)
+    return REQUIREMENTS_FILE, PIP_ARGV + ("-r", REQUIREMENTS_FILE)
+
+def requirements_fingerprint(requirements_file):
+    """Hash of a requirements file plus the interpreter the packages go into"""
+    return f"{file_sha256(requirements_file)}\n{sys.executable}\n{sys.version}\n"
+
+def requirements_up_to_date(fingerprint):
+    """Whether the last successful install was for this same fingerprint"""
+    try:
+        with open(REQUIREMENTS_LOCK) as f:
+            return f.read() == fingerprint
+    except OSError:
+        return False
+
+def save_requirements_lock(fingerprint):
+    """Record a successful install so the next run can skip pip"""
+    os.makedirs(os.path.dirname(REQUIREMENTS_LOCK), exist_ok=True)
+    with open(REQUIREMENTS_LOCK, 'w') as f:
+        f.write(fingerprint)
+
+def sample_data_up_to_date():
+    """Whether DATA_CSV was generated with SAMPLE_SIZE by the current training script"""
+    try:
+        data_stat = os.stat(DATA_CSV)
+        with open(SAMPLE_META) as f:
+            sample_size = f.read()
+    except OSError:
         return False
-    print(result.stdout)
+    return (data_stat.st_size > 0
+            and data_stat.st_mtime > os.stat(TRAINING_SCRIPT).st_mtime
+            and sample_size == str(SAMPLE_SIZE))
+
+def save_sample_meta():
+    """Record the sample size DATA_CSV was just generated with"""
+    os.makedirs(os.path.dirname(SAMPLE_META), exist_ok=True)
+    with open(SAMPLE_META, 'w') as f:
+        f.write(str(SAMPLE_SIZE))
+
+def model_fingerprint():
+    """Hashes of the training data and training script"""
+    return f"{file_sha256(DATA_CSV)}\n{file_sha256(TRAINING_SCRIPT)}\n"
+
+def save_model_hash(fingerprint):
+    """Record what MODEL_OUT was trained from so the next run can skip training"""
+    with open(MODEL_HASH, 'w') as f:
+        f.write(fingerprint)
+
+def model_up_to_date(fingerprint):
+    """Whether MODEL_OUT was trained from this same data and script"""
+    if not os.path.exists(MODEL_OUT):
+        return False
+    try:
+        with open(MODEL_HASH) as f:
+            return f.read() == fingerprint
+    except OSError:
+        return False
+
+def load_behavior_training():
+    """Import src/ml/behavior_training in this process, or None if it can't be imported"""
+    script_dir = os.path.dirname(TRAINING_SCRIPT)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    try:
+        import behavior_training
+    except ImportError as e:
+        log(f"Could not import behavior_training ({e})")
+        return None
+    return behavior_training
+
+def run_in_process(func, *args):
+    """Call a behavior_training function, raising RuntimeError if it fails"""
+    try:
+        result = func(*args)
+    except Exception as e:
+        raise RuntimeError(f"{func.__name__} failed: {e}") from e
+    if result is False:
+        raise RuntimeError(f"{func.__name__} failed")
+
+def run_in_child(*steps):
+    """Run behavior_training command lines one after another in a single child interpreter"""
+    # One interpreter start and one pandas/sklearn import, however many steps there are
+    driver = "\n".join(["import runpy, sys"] + [
+        f"sys.argv = {[TRAINING_SCRIPT, *step]!r}\nrunpy.run_path({TRAINING_SCRIPT!r}, run_name='__main__')"
+        for step in steps
+    ])
+    run_command((sys.executable, "-c", driver))
+
+def install_requirements():
+    """Install the requirements unless they were already installed into this interpreter; True if pip ran"""
+    requirements_file, pip_argv = requirements_install()
+    fingerprint = requirements_fingerprint(requirements_file)
+    if requirements_up_to_date(fingerprint):
+        log(f"Python dependencies already installed ({requirements_file} unchanged)")
+        return False
+    
+    log(f"Installing Python dependencies from {requirements_file}...")
+    run_command(pip_argv)
+    save_requirements_lock(fingerprint)
     return True
 
-def main():
-    print("Setting up Python environment for behavioral biometrics model...")
+def generate_sample(in_process):
+    """Generate the sample training data unless it is up to date; False if it has to run in a child"""
+    if sample_data_up_to_date():
+        log(f"Sample training data already generated ({DATA_CSV})")
+        return True
     
-    # Check if pip is available
-    if not run_command("python -m pip --version"):
-        print("Python pip not found. Please install Python and pip first.")
-        return
+    # Generation and training share one interpreter, so sklearn and pandas load once
+    behavior_training = load_behavior_training() if in_process else None
+    if behavior_training is None:
+        return False
     
-    # Install requirements
-    print("Installing Python dependencies...")
-    if not run_command("python -m pip install -r requirements.txt"):
-        print("Failed to install dependencies")
+    log("Generating sample training data...")
+    run_in_process(behavior_training.generate_sample_data, DATA_CSV, SAMPLE_SIZE)
+    save_sample_meta()
+    return True
+
+def train(in_process):
+    """Train the model on the sample data and save it, unless it is already up to date"""
+    fingerprint = model_fingerprint()
+    if model_up_to_date(fingerprint):
+        log(f"Model up-to-date ({MODEL_OUT})")
         return
     
-    # Generate sample data
-    print("Generating sample training data...")
-    if not run_command("python src/ml/behavior_training.py --generate-sample data/behavior_metrics.csv --sample-size 2000"):
-        print("Failed to generate sample data")
-        return
+    log("Training behavioral biometrics model...")
+    behavior_training = load_behavior_training() if in_process else None
+    if behavior_training:
+        run_in_process(behavior_training.train_and_save, DATA_CSV, MODEL_OUT)
+    else:
+        run_in_child(TRAIN_ARGS)
+    save_model_hash(fingerprint)
+
+def generate_and_train_in_child():
+    """Generate the sample data and train in one child interpreter"""
+    log("Generating sample training data and training the model in a separate process...")
+    run_in_child(GENERATE_ARGS, TRAIN_ARGS)
+    save_sample_meta()
+    save_model_hash(model_fingerprint())
+
+def setup_and_train():
+    """Install dependencies, generate sample data and train, stopping at the first failure"""
+    log("Setting up Python environment for behavioral biometrics model...")
     
-    # Train model
-    print("Training behavioral biometrics model...")
-    if not run_command("python src/ml/behavior_training.py --data data/behavior_metrics.csv --output models/behavior_model.joblib"):
-        print("Failed to train model")
-        return
+    # Check if pip is available (without starting another interpreter to ask)
+    if importlib.util.find_spec("pip") is None:
+        raise RuntimeError("Python pip not found. Please install Python and pip first.")
     
-    print("Model training completed successfully!")
-    print("Model saved to: models/behavior_model.joblib")
-    print("You can now start the behavior auth server.")
+    # Output directories exist before any step (in-process or child) writes to them
+    for directory in (os.path.dirname(DATA_CSV), os.path.dirname(MODEL_OUT)):
+        os.makedirs(directory, exist_ok=True)
+    
+    # Generation imports the packages pip installs, so it always waits for the install.
+    # Once pip has actually changed something, this interpreter may hold stale modules
+    # or import caches, so only import behavior_training here when the install was a no-op
+    in_process = not install_requirements()
+    if generate_sample(in_process):
+        train(in_process)
+    else:
+        # Run both remaining steps in one fresh interpreter that sees the installed packages
+        generate_and_train_in_child()
+    
+    log("Model training completed successfully!")
+    log(f"Model saved to: {MODEL_OUT}")
+    log("You can now start the behavior auth server.")
+
+def main():
+    try:
+        setup_and_train()
+    except RuntimeError as e:
+        log(f"Error: {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()